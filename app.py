@@ -1,7 +1,19 @@
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
+from flask import Flask, Response, g, render_template, request, jsonify, session, redirect, url_for
+import cProfile
+import io
+import json
 import os
+import pstats
+import threading
 import time
+import matching
+import metrics
+import shared_index
 from matching import AnimalMatcher # Importe la classe du fichier matching.py
+from questions import CHAT_QUESTIONS
+from encoder_service import BatchingEncoder
+from jobs import JobQueue
+from result_cache import ResultCache
 
 # --- Configuration et Initialisation ---
 app = Flask(__name__)
@@ -9,85 +21,225 @@ app = Flask(__name__)
 app.secret_key = os.environ.get('SECRET_KEY', 'votre_cle_secrete_ultra_sure_ici') 
 
 # Initialisation du Matcher
+# Le chargement (catalogue, embeddings, index, modèle NLP) se fait dans un thread de
+# préchauffage : les pages du chat sont servies pendant que le matcher se prépare.
 MATCHER = None
-try:
-    # Initialisation de la classe AnimalMatcher et entraînement du modèle KNN
-    MATCHER = AnimalMatcher(csv_path="data/animals.csv", n_neighbors=5)
-    print("Préparation des embeddings et entraînement du KNN en cours...")
-    MATCHER.train_knn()
-    print("Système AnimalMatcher prêt.")
-except FileNotFoundError:
-    print("ERREUR: Le fichier 'data/animals.csv' est introuvable. Veuillez le créer et vérifier le chemin.")
-except Exception as e:
-    print(f"Erreur lors de l'initialisation de AnimalMatcher: {e}")
-
-
-# --- Définition des Questions du Chatbot ---
-# Note: L'ordre des questions est important pour la séquence de dialogue
-CHAT_QUESTIONS = [
-    {
-        'key': 'species_preference',
-        'ai_message': "Bonjour ! Je suis l'assistant Pet Match. Ensemble, nous allons trouver ton ami parfait ! Pour commencer, quel type d'animal souhaites-tu adopter ?",
-        'options': [
-            {'label': "Un Chien 🐕", 'value': 'Dog'},
-            {'label': "Un Chat 🐈", 'value': 'Cat'},
-            {'label': "Pas de préférence", 'value': 'no preference'}
-        ]
-    },
-    {
-        'key': 'energy_preference',
-        'ai_message': "Super ! Maintenant, quelle est l'énergie que tu recherches chez ton compagnon ?",
-        'options': [
-            {'label': "Haute (très actif, joueur)", 'value': 'high'},
-            {'label': "Moyenne (équilibré, balades régulières)", 'value': 'medium'},
-            {'label': "Basse (calme, relax, siestes)", 'value': 'low'}
-        ]
-    },
-    {
-        'key': 'friendliness_preference',
-        'ai_message': "Et quel niveau d'affection cherches-tu ? Préfères-tu un animal très proche ou plus indépendant ?",
-        'options': [
-            {'label': "Très affectueux (pot de colle)", 'value': 'high'},
-            {'label': "Amical (indépendant mais gentil)", 'value': 'medium'},
-            {'label': "Indépendant (réservé, solitaire)", 'value': 'low'}
-        ]
-    },
-    {
-        'key': 'age_preference',
-        'ai_message': "Quel âge préfères-tu pour ton futur ami ? (L'âge influence souvent le niveau d'activité)",
-        'options': [
-            {'label': "Jeune (plus de travail mais très joueur)", 'value': 'young'},
-            {'label': "Adulte (personnalité stable)", 'value': 'adult'},
-            {'label': "Senior (tranquille et posé)", 'value': 'senior'}
-        ]
-    },
-    {
-        'key': 'home_type',
-        'ai_message': "Quel est ton environnement de vie ? (Pour évaluer les besoins en espace)",
-        'options': [
-            {'label': "Appartement (milieu urbain)", 'value': 'apartment'},
-            {'label': "Maison avec jardin", 'value': 'house_yard'},
-            {'label': "Foyer très actif (beaucoup de visiteurs/mouvement)", 'value': 'active'},
-            {'label': "Foyer très calme et paisible", 'value': 'quiet'}
-        ]
-    },
-    {
-        'key': 'experience',
-        'ai_message': "Enfin, as-tu déjà eu des animaux de compagnie ?",
-        'options': [
-            {'label': "Oui, je suis expérimenté", 'value': 'experienced'},
-            {'label': "Non, ce sera mon premier animal", 'value': 'first_time'}
-        ]
-    },
-    {
-        'key': 'children',
-        'ai_message': "Y a-t-il des enfants (moins de 12 ans) dans ton foyer ?",
-        'options': [
-            {'label': "Oui", 'value': True},
-            {'label': "Non", 'value': False}
-        ]
-    },
-]
+MATCHER_ERROR = None
+MATCHER_READY = threading.Event()
+STARTUP_TIMINGS = {}
+STARTED_AT = time.time()
+
+
+def warm_up():
+    """Prépare le matcher et mesure la durée de chaque étape du démarrage."""
+    global MATCHER, MATCHER_ERROR
+    started = time.perf_counter()
+    try:
+        step = time.perf_counter()
+        # Initialisation de la classe AnimalMatcher et entraînement du modèle KNN
+        matcher = AnimalMatcher(
+            csv_path=CATALOG_PATH,
+            n_neighbors=5,
+            batch_size=int(os.environ.get('EMBED_BATCH_SIZE', 64)),
+            index_backend=os.environ.get('INDEX_BACKEND', 'exact'),
+            scoring=os.environ.get('MATCH_SCORING', 'semantic'),
+            n_similar=SIMILAR_ANIMALS,
+        )
+        STARTUP_TIMINGS['catalog_s'] = round(time.perf_counter() - step, 3)
+
+        print("Préparation des embeddings et entraînement du KNN en cours...")
+        step = time.perf_counter()
+        matcher.prepare_embeddings()
+        STARTUP_TIMINGS['embeddings_s'] = round(time.perf_counter() - step, 3)
+
+        step = time.perf_counter()
+        matcher.train_knn()
+        STARTUP_TIMINGS['index_s'] = round(time.perf_counter() - step, 3)
+
+        if PROGRESSIVE_MATCHING:
+            # Fragments de toutes les réponses possibles, encodés une fois pour le matching progressif
+            matcher.precompute_fragments(CHAT_QUESTIONS)
+
+        # Le modèle sert encore aux profils absents de la table pré-calculée. En mode mémoire
+        # partagée, il n'est chargé qu'au premier profil absent, pour ne pas le dupliquer par worker.
+        if not shared_index.is_shared(CATALOG_PATH):
+            matching.get_model()
+        if matching.MODEL_LOAD_SECONDS is not None:
+            STARTUP_TIMINGS['model_load_s'] = round(matching.MODEL_LOAD_SECONDS, 3)
+
+        MATCHER = matcher
+        print("Système AnimalMatcher prêt.")
+    except FileNotFoundError:
+        MATCHER_ERROR = f"Le fichier '{CATALOG_PATH}' est introuvable."
+        print(f"ERREUR: Le fichier '{CATALOG_PATH}' est introuvable. Veuillez le créer et vérifier le chemin.")
+    except Exception as e:
+        MATCHER_ERROR = str(e)
+        print(f"Erreur lors de l'initialisation de AnimalMatcher: {e}")
+    finally:
+        STARTUP_TIMINGS['total_s'] = round(time.perf_counter() - started, 3)
+        MATCHER_READY.set()
+        print(f"Temps de démarrage : {STARTUP_TIMINGS}")
+
+    # Rechargement automatique du catalogue (désactivé si CATALOG_WATCH_INTERVAL vaut 0)
+    if MATCHER and CATALOG_WATCH_INTERVAL > 0:
+        threading.Thread(target=watch_catalog, args=(CATALOG_WATCH_INTERVAL,), daemon=True).start()
+
+
+def catalog_stamp(path):
+    """Marqueur de changement du catalogue : version publiée en mémoire partagée, sinon date de modification."""
+    if shared_index.is_shared(path):
+        return shared_index.published_version(path)
+    return os.path.getmtime(path)
+
+
+def watch_catalog(interval):
+    """
+    Surveille le catalogue et recharge les différences dès qu'il est modifié
+    (ou bascule sur la nouvelle version publiée en mémoire partagée).
+    """
+    last_stamp = catalog_stamp(MATCHER.csv_path)
+    while True:
+        time.sleep(interval)
+        try:
+            stamp = catalog_stamp(MATCHER.csv_path)
+            if stamp != last_stamp:
+                last_stamp = stamp
+                MATCHER.reload_csv()
+        except Exception as e:
+            print(f"Erreur lors du rechargement du catalogue: {e}")
+
+
+# Catalogue CSV, bundle binaire (voir catalog_bundle.py, démarrage sans parsing ni encodage)
+# ou 'shm://<préfixe>' pour s'attacher au catalogue publié par shared_index.py
+CATALOG_PATH = os.environ.get('CATALOG_PATH', 'data/animals.csv')
+CATALOG_WATCH_INTERVAL = float(os.environ.get('CATALOG_WATCH_INTERVAL', 0))
+# Matching progressif (opt-in) : le profil est composé des fragments déjà répondus et une
+# shortlist est tenue à jour en session à chaque réponse du chat; les résultats finaux sont
+# prêts dès la dernière réponse (voir AnimalMatcher.progressive_shortlist et
+# benchmarks/progressive_quality.py pour l'écart avec l'encodage de la phrase complète)
+PROGRESSIVE_MATCHING = os.environ.get('PROGRESSIVE_MATCHING', '0') == '1'
+PROGRESSIVE_SHORTLIST_SIZE = int(os.environ.get('PROGRESSIVE_SHORTLIST_SIZE', 50))
+# Animaux similaires pré-calculés par animal, affichés sur la fiche détaillée (0 = désactivé, défaut).
+# Le graphe est calculé par chaque worker (coût en O(n²) par espèce au démarrage) : à activer
+# en connaissance de cause sur les gros catalogues
+SIMILAR_ANIMALS = int(os.environ.get('SIMILAR_ANIMALS', 0))
+# Moteur d'encodage : 'transformer' (défaut), 'quantized' (int8, CPU) ou 'hashing' (sans modèle),
+# voir encoders.py et benchmarks/encoder_report.py. En mode mémoire partagée, utiliser le même
+# moteur que le processus chargeur (shared_index.py --encoder) : sinon chaque worker ré-encode le catalogue.
+matching.configure_encoder(os.environ.get('ENCODER_BACKEND', 'transformer'),
+                           int(os.environ['ENCODER_THREADS']) if os.environ.get('ENCODER_THREADS') else None)
+# 'background' (défaut) : préchauffage en arrière-plan; 'sync' : bloque l'import comme avant
+if os.environ.get('MATCHER_WARMUP', 'background') == 'sync':
+    warm_up()
+else:
+    threading.Thread(target=warm_up, name='matcher-warm-up', daemon=True).start()
+
+# Cache serveur des résultats : la session ne garde que la clé ('match_key')
+RESULT_CACHE = ResultCache(
+    max_size=int(os.environ.get('RESULT_CACHE_SIZE', 1024)),
+    ttl=float(os.environ.get('RESULT_CACHE_TTL', 3600)),
+)
+
+# Encodage par micro-lots des profils absents du cache : les requêtes concurrentes partagent
+# une passe du modèle (ENCODER_MAX_WAIT_MS = 0 pour appeler le modèle directement)
+ENCODER_MAX_WAIT_MS = float(os.environ.get('ENCODER_MAX_WAIT_MS', 5))
+ENCODER_SERVICE = None
+if ENCODER_MAX_WAIT_MS > 0:
+    ENCODER_SERVICE = BatchingEncoder(
+        matching.encode_texts,
+        max_batch_size=int(os.environ.get('ENCODER_MAX_BATCH', 32)),
+        max_wait_ms=ENCODER_MAX_WAIT_MS,
+    )
+    matching.set_encoder_service(ENCODER_SERVICE)
+
+# Pool des tâches de matching lancées dès la dernière réponse du chat
+MATCH_JOBS = JobQueue(
+    max_workers=int(os.environ.get('MATCH_JOB_WORKERS', 2)),
+    ttl=float(os.environ.get('MATCH_JOB_TTL', 600)),
+)
+
+# Temps maximal d'attente du matcher dans /results avant de réafficher la page d'attente
+RESULTS_WARMUP_WAIT = float(os.environ.get('RESULTS_WARMUP_WAIT', 10))
+
+# Profilage à la demande : si PROFILE_DIR est défini, une requête avec ?profile=1 (ou l'en-tête
+# X-Profile: 1) est profilée par cProfile et ses statistiques sont écrites dans ce dossier
+PROFILE_DIR = os.environ.get('PROFILE_DIR')
+
+CATALOG_ANIMALS = metrics.REGISTRY.gauge('petmatch_catalog_animals', "Nombre d'animaux du catalogue.")
+CATALOG_VERSION = metrics.REGISTRY.gauge('petmatch_catalog_version', "Version courante du catalogue.")
+MATCHER_UP = metrics.REGISTRY.gauge('petmatch_matcher_ready', "1 quand le matcher est prêt.")
+
+
+@app.before_request
+def start_request_timer():
+    """Démarre le chronomètre (et le profileur si demandé) de la requête."""
+    g.started_at = time.perf_counter()
+    g.profiler = None
+    if PROFILE_DIR and (request.args.get('profile') == '1' or request.headers.get('X-Profile') == '1'):
+        g.profiler = cProfile.Profile()
+        g.profiler.enable()
+
+
+@app.after_request
+def record_request_metrics(response):
+    """Enregistre la durée et le statut de la requête par route (les réponses en flux sont mesurées jusqu'au premier octet)."""
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    elapsed = time.perf_counter() - g.get('started_at', time.perf_counter())
+    metrics.REQUEST_SECONDS.observe(elapsed, route=route, method=request.method)
+    metrics.REQUESTS_TOTAL.inc(route=route, method=request.method, status=response.status_code)
+
+    profiler = g.get('profiler')
+    if profiler is not None:
+        profiler.disable()
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{request.endpoint or 'unmatched'}-{int(elapsed * 1000)}ms.prof"
+        profiler.dump_stats(os.path.join(PROFILE_DIR, name))
+        summary = io.StringIO()
+        pstats.Stats(profiler, stream=summary).sort_stats('cumulative').print_stats(15)
+        print(f"Profil de {request.path} ({elapsed * 1000:.1f} ms) écrit dans {name}\n{summary.getvalue()}")
+    return response
+
+
+def run_match_job(user_answers):
+    """
+    Tâche de fond : calcule les matches d'un questionnaire et les dépose dans le cache de résultats.
+
+    Returns:
+        La clé des résultats dans RESULT_CACHE.
+    """
+    # Pendant le préchauffage, c'est le thread de la tâche qui attend, pas la requête web
+    MATCHER_READY.wait()
+    if not MATCHER:
+        raise RuntimeError(MATCHER_ERROR or "Le système de matching n'est pas prêt.")
+    match_key = RESULT_CACHE.make_key(user_answers, MATCHER.catalog_version)
+    matches = RESULT_CACHE.get(match_key)
+    metrics.CACHE_TOTAL.inc(cache='result', result='miss' if matches is None else 'hit')
+    if matches is None:
+        with metrics.stage('match'):
+            matches = MATCHER.match_records(user_answers)
+        RESULT_CACHE.put(match_key, matches)
+    return match_key
+
+
+def progressive_step(user_answers, final):
+    """
+    Met à jour le matching progressif après une réponse.
+
+    Returns:
+        La clé des résultats finaux dans RESULT_CACHE (dernière réponse), sinon None.
+    """
+    # Matcher pas encore prêt ou score hybride : le matching se fait en fin de chat comme avant
+    if not (PROGRESSIVE_MATCHING and MATCHER and MATCHER.scoring == 'semantic'):
+        return None
+    if not final:
+        with metrics.stage('progressive_shortlist'):
+            session['shortlist'] = MATCHER.progressive_shortlist(user_answers, PROGRESSIVE_SHORTLIST_SIZE)
+        return None
+    # Clé distincte de celle des résultats calculés sur la phrase complète
+    match_key = RESULT_CACHE.make_key(user_answers, f"progressive-{MATCHER.catalog_version}")
+    if RESULT_CACHE.get(match_key) is None:
+        RESULT_CACHE.put(match_key, MATCHER.progressive_matches(user_answers, session.get('shortlist')))
+    return match_key
 
 
 # --- Routes Flask ---
@@ -103,6 +255,10 @@ def start_chat():
     """Affiche la page du chatbot et initialise la session."""
     session['user_answers'] = {}
     session['current_step'] = 0
+    session.pop('match_job', None)
+    session.pop('shortlist', None)
+    session.pop('progressive_key', None)
+    session.pop('match_key', None)
     return render_template('chatbot.html')
 
 
@@ -110,8 +266,9 @@ def start_chat():
 def chat():
     """Gère la logique de dialogue (question/réponse)."""
     
-    if not MATCHER:
-        # Erreur si le matcher n'a pas été initialisé (ex: fichier CSV manquant)
+    if MATCHER_READY.is_set() and not MATCHER:
+        # Erreur si le matcher n'a pas pu être initialisé (ex: fichier CSV manquant).
+        # Pendant le préchauffage, le dialogue continue : seul /results a besoin du matcher.
         return jsonify({'status': 'error', 'ai_message': "Le système de matching n'est pas prêt. Le fichier de données est peut-être manquant."}), 500
 
     data = request.get_json()
@@ -130,13 +287,24 @@ def chat():
              session['user_answers'][q_key] = user_answer
              
         session['current_step'] += 1
+
+        # Matching progressif : shortlist mise à jour, ou résultats finaux à la dernière réponse
+        progressive_key = progressive_step(dict(session['user_answers']),
+                                           session['current_step'] >= len(CHAT_QUESTIONS))
+        if progressive_key:
+            session['progressive_key'] = progressive_key
+            return jsonify({'status': 'match_found', 'redirect_url': '/results'})
         
     current_step = session.get('current_step', 0)
     
     # 2. Vérifier si toutes les questions ont été posées
     if current_step >= len(CHAT_QUESTIONS):
-        # Toutes les réponses sont collectées -> Lancer le matching
-        return jsonify({'status': 'match_found', 'redirect_url': '/waiting'})
+        # Toutes les réponses sont collectées -> Lancer le matching en arrière-plan
+        # pendant que le navigateur affiche la page d'attente
+        user_answers = dict(session['user_answers'])
+        job_id = MATCH_JOBS.submit(run_match_job, user_answers, key=RESULT_CACHE.make_key(user_answers, None))
+        session['match_job'] = job_id
+        return jsonify({'status': 'match_found', 'redirect_url': '/waiting', 'job_id': job_id})
         
     # 3. Poser la prochaine question
     else:
@@ -154,8 +322,21 @@ def chat():
 
 @app.route('/waiting')
 def waiting():
-    """Affiche la page d'attente. La redirection vers /results est gérée par le JS de waiting.html."""
-    return render_template('waiting.html')
+    """
+    Affiche la page d'attente. Le JS de waiting.html interroge l'état de la tâche de matching
+    et redirige vers /results dès qu'elle est terminée.
+    """
+    return render_template('waiting.html', job_id=session.get('match_job'))
+
+
+@app.route('/api/jobs/<job_id>')
+def job_status(job_id):
+    """État d'une tâche de matching (queued, running, done, error ou unknown)."""
+    status = MATCH_JOBS.status(job_id)
+    if status['status'] in ('done', 'error', 'unknown'):
+        # /results affiche les résultats, ou recalcule/redirige si la tâche n'a pas abouti
+        status['redirect_url'] = url_for('results')
+    return jsonify(status)
 
 
 @app.route('/results')
@@ -163,43 +344,190 @@ def results():
     """Affiche la page des résultats après le matching."""
     user_answers = session.get('user_answers')
     
-    if not user_answers or not MATCHER:
+    if not user_answers:
+        return redirect(url_for('home')) 
+
+    # Rechargement de la page ou retour depuis une fiche : résultats déjà affichés, lus par leur clé
+    match_key = session.get('match_key')
+    matches = RESULT_CACHE.get(match_key) if match_key else None
+    if matches is not None:
+        return render_results(matches)
+
+    job_id = session.get('match_job')
+    if job_id and MATCH_JOBS.status(job_id)['status'] in ('queued', 'running'):
+        # Tâche encore en cours : la page d'attente continue d'interroger son état
+        return render_template('waiting.html', job_id=job_id)
+
+    if not MATCHER_READY.wait(RESULTS_WARMUP_WAIT):
+        # Matcher encore en préchauffage : la page d'attente revient ici quelques secondes plus tard
+        return render_template('waiting.html')
+    if not MATCHER:
         return redirect(url_for('home')) 
     
     try:
-        # Lancer la fonction de matching
-        matches_df = MATCHER.find_matches(user_answers)
-        
-        # Convertir les résultats en une liste de dictionnaires pour le template HTML
-        matches = matches_df.to_dict('records')
+        # Résultats déposés par le matching progressif ou par la tâche de fond; à défaut (tâche
+        # expirée, en erreur ou lancée par un autre processus), le matching est calculé ici comme avant
+        match_key = session.get('progressive_key') or (MATCH_JOBS.result(job_id) if job_id else None)
+        matches = RESULT_CACHE.get(match_key) if match_key else None
+        if matches is None:
+            match_key = run_match_job(user_answers)
+            matches = RESULT_CACHE.get(match_key)
         
-        # Le premier match est le meilleur
-        best_match = matches[0] if matches else None
-        other_matches = matches[1:] if len(matches) > 1 else []
-        
-        # Stocker les résultats en session (utile pour pet-info)
-        session['last_matches'] = matches
-        
-        return render_template('results.html', best_match=best_match, other_matches=other_matches)
+        # Seule la clé des résultats est stockée en session (cookie léger)
+        session['match_key'] = match_key
+        return render_results(matches)
         
     except Exception as e:
         app.logger.error(f"Erreur lors du matching: {e}")
         return render_template('error.html', message=f"Désolé, une erreur s'est produite lors de la recherche du match parfait : {e}"), 500
 
 
+def render_results(matches):
+    """Page des résultats : le premier match est le meilleur."""
+    best_match = matches[0] if matches else None
+    other_matches = matches[1:] if len(matches) > 1 else []
+    with metrics.stage('render_results'):
+        return render_template('results.html', best_match=best_match, other_matches=other_matches)
+
 
 @app.route('/pet-info/<int:pet_id>')
 def pet_info(pet_id):
     """Affiche les informations détaillées d'un animal spécifique."""
-    if MATCHER and MATCHER.df is not None:
-        try:
-            # Récupérer la ligne correspondante à l'ID
-            pet = MATCHER.df[MATCHER.df['id'] == pet_id].iloc[0].to_dict()
-            return render_template('pet_info.html', pet=pet)
-        except IndexError:
+    if MATCHER:
+        # Recherche par id en temps constant dans le RecordStore
+        pet = MATCHER.get_pet(pet_id)
+        if pet is None:
             return render_template('error.html', message="Animal non trouvé."), 404
+        # Recommandations lues dans le graphe pré-calculé, sans requête KNN
+        similar = MATCHER.similar_animals(pet_id)
+        with metrics.stage('render_pet_info'):
+            return render_template('pet_info.html', pet=pet, similar=similar)
     else:
         return redirect(url_for('home'))
+
+
+@app.route('/api/pets/<int:pet_id>/similar')
+def similar_pets(pet_id):
+    """Animaux similaires à un animal (JSON), paramètre optionnel ?k= (au plus SIMILAR_ANIMALS)."""
+    if not MATCHER:
+        return jsonify({'status': 'error', 'message': "Le système de matching n'est pas prêt."}), 503
+    k = request.args.get('k', type=int)
+    if k is not None and k <= 0:
+        return jsonify({'status': 'error', 'message': "'k' doit être un entier strictement positif."}), 400
+    similar = MATCHER.similar_animals(pet_id, k)
+    if similar is None:
+        return jsonify({'status': 'error', 'message': "Animal non trouvé."}), 404
+    return jsonify({'pet_id': pet_id,
+                    'similar': [{field: pet.get(field) for field in BATCH_MATCH_FIELDS} for pet in similar]})
+
+
+# Champs renvoyés par défaut pour chaque animal par l'API de matching groupé
+BATCH_MATCH_FIELDS = ['id', 'name', 'species', 'breed', 'age_years', 'img_url', 'match_score']
+BATCH_MATCH_MAX_SIZE = int(os.environ.get('BATCH_MATCH_MAX_SIZE', 10000))
+# Valeurs acceptées pour chaque question du chatbot (réponses partielles autorisées)
+ANSWER_VALUES = {q['key']: [o['value'] for o in q.get('options', [])] for q in CHAT_QUESTIONS}
+
+
+def answers_error(answers):
+    """Message d'erreur si un questionnaire n'a pas la forme des réponses du chatbot, sinon None."""
+    if not isinstance(answers, dict):
+        return "chaque questionnaire doit être un dictionnaire"
+    for key, value in answers.items():
+        if key not in ANSWER_VALUES:
+            return f"question inconnue '{key}'"
+        allowed = ANSWER_VALUES[key]
+        # bool est un int en Python : 1 ne doit pas passer pour True
+        if not any(type(value) is type(v) and value == v for v in allowed):
+            return f"valeur invalide pour '{key}' (choix : {', '.join(map(str, allowed))})"
+    return None
+
+
+@app.route('/api/match/batch', methods=['POST'])
+def match_batch():
+    """
+    Matching groupé de plusieurs questionnaires (campagnes de re-matching).
+
+    Corps JSON : {"answers": [{...}, ...], "fields": [...] (optionnel)}.
+    Réponse en NDJSON, une ligne par questionnaire dès que son groupe d'espèce est calculé :
+    {"index": i, "matches": [...]}.
+    """
+    if not MATCHER:
+        return jsonify({'status': 'error', 'message': "Le système de matching n'est pas prêt."}), 503
+
+    data = request.get_json(silent=True) or {}
+    answers_list = data.get('answers')
+    if not isinstance(answers_list, list):
+        return jsonify({'status': 'error', 'message': "'answers' doit être une liste de dictionnaires."}), 400
+    if len(answers_list) > BATCH_MATCH_MAX_SIZE:
+        return jsonify({'status': 'error', 'message': f"Au plus {BATCH_MATCH_MAX_SIZE} questionnaires par requête."}), 413
+    # Validation complète avant la réponse : une erreur pendant le streaming tronquerait le NDJSON
+    for i, answers in enumerate(answers_list):
+        error = answers_error(answers)
+        if error:
+            return jsonify({'status': 'error', 'message': f"Questionnaire {i} : {error}."}), 400
+    fields = data.get('fields') or BATCH_MATCH_FIELDS
+    if not isinstance(fields, list) or not all(isinstance(f, str) for f in fields):
+        return jsonify({'status': 'error', 'message': "'fields' doit être une liste de noms de colonnes."}), 400
+
+    def generate():
+        for i, matches in MATCHER.iter_matches_batch(answers_list):
+            columns = [c for c in fields if c in matches.columns]
+            line = {'index': i, 'matches': matches[columns].to_dict('records')}
+            yield json.dumps(line, ensure_ascii=False, default=str) + '\n'
+
+    return Response(generate(), mimetype='application/x-ndjson')
+
+
+@app.route('/admin/reload', methods=['POST'])
+def admin_reload():
+    """Recharge les différences du CSV du catalogue sans redémarrer (protégé par ADMIN_TOKEN)."""
+    admin_token = os.environ.get('ADMIN_TOKEN')
+    if not admin_token or request.headers.get('X-Admin-Token') != admin_token:
+        return jsonify({'status': 'error', 'message': "Accès refusé."}), 403
+    if not MATCHER:
+        return jsonify({'status': 'error', 'message': "Le système de matching n'est pas prêt."}), 503
+
+    try:
+        summary = MATCHER.reload_csv()
+    except Exception as e:
+        app.logger.error(f"Erreur lors du rechargement du catalogue: {e}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+    return jsonify({'status': 'ok', **summary})
+
+
+
+@app.route('/health')
+def health():
+    """Sonde de vie : répond toujours, avec l'état du préchauffage et les temps de démarrage."""
+    if not MATCHER_READY.is_set():
+        state = 'warming_up'
+    else:
+        state = 'ready' if MATCHER else 'error'
+    return jsonify({
+        'status': state,
+        'uptime_s': round(time.time() - STARTED_AT, 3),
+        'startup_timings': STARTUP_TIMINGS,
+        'encoder': ENCODER_SERVICE.stats() if ENCODER_SERVICE else None,
+        'error': MATCHER_ERROR,
+    })
+
+
+@app.route('/ready')
+def ready():
+    """Sonde de disponibilité : 200 quand le matcher est prêt, 503 sinon."""
+    response = health()
+    return response, 200 if MATCHER else 503
+
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Métriques au format texte de Prometheus (latences par étape et par route, caches, replis)."""
+    MATCHER_UP.set(1 if MATCHER else 0)
+    if MATCHER:
+        CATALOG_ANIMALS.set(len(MATCHER.df))
+        CATALOG_VERSION.set(MATCHER.catalog_version)
+    return Response(metrics.REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
         
 # --- Démarrage de l'Application ---
 if __name__ == '__main__':
@@ -0,0 +1,88 @@
+"""
+Benchmark rappel / latence du moteur IVF face à la recherche exacte.
+
+Usage (depuis la racine du dépôt) :
+    python -m benchmarks.ann_recall --n 100000 --nprobe 1 4 8 16 32
+    python -m benchmarks.ann_recall --catalog   # embeddings réels de data/animals.csv
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from search import ExactIndex, IVFIndex
+
+
+def synthetic_vectors(n, dim, n_clusters=200, seed=0):
+    """Vecteurs regroupés en nuages gaussiens, proches de la structure d'embeddings de texte."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(n_clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, n_clusters, size=n)
+    return centers[labels] + 0.6 * rng.normal(size=(n, dim)).astype(np.float32)
+
+
+def catalog_vectors():
+    """Embeddings du catalogue réel (nécessite le modèle ou le cache d'embeddings)."""
+    from matching import AnimalMatcher
+    matcher = AnimalMatcher()
+    matcher.prepare_embeddings()
+    return matcher.animal_vectors
+
+
+def time_queries(index, queries, k):
+    """Exécute les requêtes et retourne (résultats, latence moyenne en ms)."""
+    results = []
+    started = time.perf_counter()
+    for q in queries:
+        results.append(index.search(q, k)[0])
+    elapsed = time.perf_counter() - started
+    return results, 1000 * elapsed / len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--n', type=int, default=100000, help="Taille du catalogue synthétique")
+    parser.add_argument('--dim', type=int, default=384)
+    parser.add_argument('--catalog', action='store_true', help="Utiliser les embeddings de data/animals.csv")
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--n-lists', type=int, default=None, help="Nombre de cellules IVF (défaut : racine de n)")
+    parser.add_argument('--nprobe', type=int, nargs='+', default=[1, 4, 8, 16, 32])
+    parser.add_argument('--output', help="Fichier JSON où enregistrer les résultats")
+    args = parser.parse_args()
+
+    vectors = catalog_vectors() if args.catalog else synthetic_vectors(args.n, args.dim)
+    rows = np.arange(len(vectors))
+    rng = np.random.default_rng(1)
+    # Requêtes : vecteurs du catalogue bruités, pour ne pas tomber exactement sur un point
+    queries = vectors[rng.choice(len(vectors), args.queries)] + 0.3 * rng.normal(size=(args.queries, vectors.shape[1]))
+
+    exact = ExactIndex(vectors, rows)
+    truth, exact_ms = time_queries(exact, queries, args.k)
+
+    started = time.perf_counter()
+    ivf = IVFIndex(vectors, rows, n_lists=args.n_lists)
+    build_s = time.perf_counter() - started
+
+    print(f"Catalogue : {len(vectors)} vecteurs, {ivf.n_lists} cellules IVF (construction {build_s:.1f}s)")
+    print(f"{'moteur':<14}{'rappel@' + str(args.k):>10}{'ms/requête':>14}{'accélération':>14}")
+    print(f"{'exact':<14}{1.0:>10.3f}{exact_ms:>14.3f}{1.0:>14.1f}")
+
+    report = {'n': len(vectors), 'k': args.k, 'n_lists': ivf.n_lists, 'build_s': build_s,
+              'exact_ms': exact_ms, 'ivf': []}
+    for nprobe in args.nprobe:
+        ivf.nprobe = nprobe
+        found, ivf_ms = time_queries(ivf, queries, args.k)
+        recall = np.mean([len(np.intersect1d(a, b)) / len(b) for a, b in zip(found, truth)])
+        print(f"{'ivf nprobe=' + str(nprobe):<14}{recall:>10.3f}{ivf_ms:>14.3f}{exact_ms / ivf_ms:>14.1f}")
+        report['ivf'].append({'nprobe': nprobe, 'recall': float(recall), 'ms': ivf_ms})
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"✓ Résultats enregistrés dans {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+"""
+Micro-benchmarks des étapes du matcher sur des catalogues synthétiques.
+
+Les catalogues sont produits par generate.write_animals (reproductibles pour une graine).
+Chaque étape (prepare_embeddings, train_knn, create_user_profile, find_matches) est
+chronométrée à froid et à chaud, avec la mémoire résidente du processus. Par défaut, un
+encodeur déterministe remplace le modèle téléchargé : le benchmark tourne hors ligne et
+ses résultats sont comparables d'une machine à l'autre (à matériel égal).
+
+Usage (depuis la racine du dépôt) :
+    python -m benchmarks.bench_matcher --sizes 1000 10000 100000
+    python -m benchmarks.bench_matcher --save-baseline benchmarks/baseline.json
+    python -m benchmarks.bench_matcher --compare benchmarks/baseline.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import tempfile
+import time
+
+import matching
+from encoders import HashingEncoder
+from matching import AnimalMatcher
+
+CACHE_DIR = os.path.join(os.path.dirname(__file__), '.cache')
+
+
+def rss_mb():
+    """Mémoire résidente actuelle du processus (Mo), ou None si indisponible."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1e6
+    except (OSError, ValueError):
+        return None
+
+
+def catalog_csv(n, seed=0):
+    """CSV d'un catalogue synthétique de n animaux (généré une fois puis réutilisé)."""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = os.path.join(CACHE_DIR, f"catalog_{n}_seed{seed}.csv")
+    if not os.path.exists(path):
+        from generate import write_animals
+        print(f"Génération d'un catalogue synthétique de {n} animaux...")
+        with quiet():
+            write_animals(path, n, seed=seed, workers=min(os.cpu_count() or 1, 8) if n >= 100000 else 1)
+    return path
+
+
+def random_answers(count, seed=0):
+    """Questionnaires complets tirés au hasard parmi les options du chatbot."""
+    from questions import CHAT_QUESTIONS
+    rng = random.Random(seed)
+    return [{q['key']: rng.choice(q['options'])['value'] for q in CHAT_QUESTIONS} for _ in range(count)]
+
+
+@contextlib.contextmanager
+def quiet():
+    """Masque les print du matcher pendant les mesures."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def timed(results, stage, fn, repeat=1):
+    """Exécute fn `repeat` fois et enregistre la durée moyenne (ms) et la mémoire résidente."""
+    before = rss_mb()
+    started = time.perf_counter()
+    with quiet():
+        for _ in range(repeat):
+            value = fn()
+    elapsed_ms = 1000 * (time.perf_counter() - started) / repeat
+    after = rss_mb()
+    results[stage] = {
+        'ms': round(elapsed_ms, 3),
+        'rss_mb': round(after, 1) if after is not None else None,
+        'rss_delta_mb': round(after - before, 1) if after is not None else None,
+    }
+    return value
+
+
+def bench_size(n, args):
+    """Mesure toutes les étapes du matcher pour un catalogue de n animaux."""
+    csv_path = catalog_csv(n)
+    answers = random_answers(args.queries)
+    results = {}
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        def build():
+            return AnimalMatcher(csv_path=csv_path, cache_dir=cache_dir, batch_size=args.batch_size,
+                                 index_backend=args.backend)
+
+        matcher = timed(results, 'load_csv', build)
+        timed(results, 'prepare_embeddings_cold', matcher.prepare_embeddings)
+        # Cache d'embeddings désormais rempli : démarrage à chaud
+        with quiet():
+            matcher = build()
+        timed(results, 'prepare_embeddings_warm', matcher.prepare_embeddings)
+        timed(results, 'train_knn', matcher.train_knn)
+
+        profiles = iter(answers * 2)
+        timed(results, 'create_user_profile', lambda: matcher.create_user_profile(next(profiles)),
+              repeat=len(answers))
+
+        # À froid : profils absents du LRU (encodés), à chaud : profils déjà en cache
+        queries = iter(answers)
+        timed(results, 'find_matches_cold', lambda: matcher.find_matches(next(queries)), repeat=len(answers))
+        queries = iter(answers)
+        timed(results, 'find_matches_warm', lambda: matcher.find_matches(next(queries)), repeat=len(answers))
+        timed(results, 'find_matches_batch', lambda: matcher.find_matches_batch(answers))
+
+        results['memory'] = {
+            'animal_vectors_mb': round(matcher.animal_vectors.nbytes / 1e6, 1),
+            # Embeddings en lecture seule : memory-map ou mémoire partagée, hors mémoire propre du processus
+            'animal_vectors_mapped': not matcher.animal_vectors.flags.writeable,
+            'dataframe_mb': round(float(matcher.df.memory_usage(deep=True).sum()) / 1e6, 1),
+        }
+    return results
+
+
+def compare(current, baseline, threshold):
+    """Affiche les écarts de durée avec une référence et retourne le nombre de régressions."""
+    regressions = 0
+    print(f"\n{'catalogue':<10}{'étape':<28}{'réf. ms':>12}{'ms':>12}{'écart':>10}")
+    for size, stages in current['results'].items():
+        for stage, values in stages.items():
+            reference = baseline.get('results', {}).get(size, {}).get(stage)
+            if not reference or 'ms' not in values or not reference.get('ms'):
+                continue
+            change = values['ms'] / reference['ms'] - 1
+            flag = ''
+            if change > threshold:
+                flag = '  ⚠️ régression'
+                regressions += 1
+            print(f"{size:<10}{stage:<28}{reference['ms']:>12.3f}{values['ms']:>12.3f}{change:>+10.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help="Tailles de catalogue (ex. 1000 10000 100000 1000000)")
+    parser.add_argument('--queries', type=int, default=50, help="Nombre de questionnaires par mesure")
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--backend', default='exact', help="Moteur d'index (exact, ivf, quantized)")
+    parser.add_argument('--real-model', action='store_true', help="Utiliser le vrai modèle au lieu de l'encodeur déterministe")
+    parser.add_argument('--save-baseline', help="Enregistre les résultats comme référence (JSON)")
+    parser.add_argument('--compare', help="Compare les résultats à une référence (JSON)")
+    parser.add_argument('--threshold', type=float, default=0.2, help="Écart relatif signalé comme régression")
+    args = parser.parse_args()
+
+    if not args.real_model:
+        matching.set_model(HashingEncoder())
+
+    report = {
+        'encoder': 'model' if args.real_model else 'hashing',
+        'backend': args.backend,
+        'queries': args.queries,
+        'results': {},
+    }
+    for n in args.sizes:
+        print(f"\n=== Catalogue de {n} animaux ===")
+        results = bench_size(n, args)
+        report['results'][str(n)] = results
+        for stage, values in results.items():
+            if stage != 'memory':
+                print(f"  {stage:<28}{values['ms']:>12.3f} ms   RSS {values['rss_mb']} Mo")
+        print(f"  mémoire : {results['memory']}")
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print(f"\n✓ Référence enregistrée dans {args.save_baseline}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        print(f"\n{regressions} régression(s) au-delà de {args.threshold:.0%}.")
+        if regressions:
+            raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+"""
+Latence et qualité de chaque moteur d'encodage (voir encoders.py), pour choisir le moins
+coûteux qui donne encore un matching acceptable sur la machine de production.
+
+Pour chaque moteur :
+    - chargement : durée de création de l'encodeur (téléchargement exclu s'il est en cache);
+    - latence d'un profil (un texte, comme get_vector) : p50 / p95 en ms;
+    - débit sur les descriptions du catalogue (encodage par lots) en textes/s;
+    - qualité : part des animaux du top-k dont l'énergie, l'affection et l'âge tombent dans
+      la plage demandée (voir scoring.ANSWER_CONSTRAINTS), et rappel@k face au top-k du
+      moteur de référence (le premier moteur chargé, 'transformer' par défaut).
+Un moteur qui ne peut pas être chargé (modèle absent, PyTorch non installé) est signalé et ignoré.
+
+Usage (depuis la racine du dépôt) :
+    python -m benchmarks.encoder_report
+    python -m benchmarks.encoder_report --backends quantized hashing --threads 2 --output encoders.json
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+import matching
+from benchmarks.bench_matcher import catalog_csv, quiet, random_answers
+from encoders import ENCODER_BACKENDS, create_encoder
+from matching import AnimalMatcher
+from scoring import ANSWER_CONSTRAINTS
+
+
+def constraint_hits(df, rows, answers):
+    """Part des contraintes (énergie, affection, âge) respectées par les lignes `rows`."""
+    hits, total = 0, 0
+    for key, (col, ranges, _) in ANSWER_CONSTRAINTS.items():
+        if answers.get(key) not in ranges or col not in df.columns:
+            continue
+        low, high = ranges[answers[key]]
+        values = df[col].to_numpy(dtype=np.float64)[rows]
+        hits += int(np.count_nonzero((values >= low) & (values <= high)))
+        total += len(values)
+    return hits / total if total else 1.0
+
+
+def measure(backend, csv_path, answers_list, k, threads):
+    """Mesures d'un moteur; retourne (rapport, top-k par questionnaire) ou (None, None) s'il est indisponible."""
+    started = time.perf_counter()
+    try:
+        with quiet():
+            encoder = create_encoder(backend, matching.MODEL_NAME, matching.VECTOR_DIMENSION, threads)
+    except Exception as e:
+        print(f"⚠️ AVERTISSEMENT : Moteur '{backend}' indisponible ({e}), ignoré.")
+        return None, None
+    load_s = time.perf_counter() - started
+    matching.set_model(encoder)
+
+    with quiet():
+        matcher = AnimalMatcher(csv_path=csv_path, n_neighbors=k, cache_dir=None)
+    descriptions = matcher.df['personality_description'].tolist()
+    started = time.perf_counter()
+    with quiet():
+        matcher.prepare_embeddings()
+    batch_s = time.perf_counter() - started
+    with quiet():
+        matcher.train_knn()
+
+    profiles = [matcher.create_user_profile(a) for a in answers_list]
+    encoder.encode(profiles[0])  # premier appel (allocations, caches internes) hors mesure
+    single_ms = []
+    for profile in profiles:
+        started = time.perf_counter()
+        encoder.encode(profile)
+        single_ms.append(1000 * (time.perf_counter() - started))
+
+    results, hits = [], []
+    with quiet():
+        for answers in answers_list:
+            df, _, rows, _ = matcher._search(answers)
+            results.append(np.asarray(rows))
+            hits.append(constraint_hits(df, rows, answers))
+
+    report = {
+        'backend': backend,
+        'name': encoder.name,
+        'load_s': round(load_s, 3),
+        'profile_ms_p50': round(float(np.percentile(single_ms, 50)), 3),
+        'profile_ms_p95': round(float(np.percentile(single_ms, 95)), 3),
+        'catalog_texts_per_s': round(len(descriptions) / max(batch_s, 1e-9), 1),
+        'constraint_hit_rate': round(float(np.mean(hits)), 3),
+    }
+    return report, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--csv', default='data/animals.csv', help="Catalogue CSV (ignoré si --size est donné)")
+    parser.add_argument('--size', type=int, help="Taille d'un catalogue synthétique (voir generate.py)")
+    parser.add_argument('--backends', nargs='+', default=list(ENCODER_BACKENDS), choices=ENCODER_BACKENDS,
+                        help="Moteurs à comparer, le premier disponible sert de référence")
+    parser.add_argument('--queries', type=int, default=200, help="Nombre de questionnaires tirés au hasard")
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--threads', type=int, help="Threads PyTorch des moteurs transformer / quantized")
+    parser.add_argument('--output', help="Fichier JSON où enregistrer le rapport")
+    args = parser.parse_args()
+
+    csv_path = catalog_csv(args.size) if args.size else args.csv
+    answers_list = random_answers(args.queries)
+
+    reports, reference = [], None
+    for backend in args.backends:
+        report, results = measure(backend, csv_path, answers_list, args.k, args.threads)
+        if report is None:
+            continue
+        if reference is None:
+            reference = (backend, results)
+        report['recall_vs_reference'] = round(float(np.mean([
+            len(np.intersect1d(a, b)) / max(len(b), 1) for a, b in zip(results, reference[1])])), 3)
+        reports.append(report)
+
+    if not reports:
+        raise SystemExit("ERREUR: Aucun moteur d'encodage disponible.")
+
+    print(f"\n{args.queries} questionnaires, top-{args.k}, référence : {reference[0]}")
+    print(f"{'moteur':<13}{'chargement s':>13}{'profil p50 ms':>15}{'p95 ms':>9}{'textes/s':>11}"
+          f"{'contraintes':>13}{'rappel@k':>10}")
+    for r in reports:
+        print(f"{r['backend']:<13}{r['load_s']:>13.2f}{r['profile_ms_p50']:>15.3f}{r['profile_ms_p95']:>9.3f}"
+              f"{r['catalog_texts_per_s']:>11.0f}{r['constraint_hit_rate']:>13.3f}{r['recall_vs_reference']:>10.3f}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'k': args.k, 'queries': args.queries, 'reference': reference[0], 'backends': reports},
+                      f, indent=2)
+        print(f"✓ Rapport enregistré dans {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,266 @@
+"""
+Test de charge HTTP du parcours complet d'un adoptant :
+    GET /start-chat -> POST /chat (appel initial + une réponse par question) -> GET /waiting
+    -> GET /api/jobs/<id> (jusqu'à la fin du matching, comme waiting.html) -> GET /results
+
+Chaque adoptant simulé garde sa propre session (cookie) et répond au hasard parmi les options
+du chatbot. Par défaut, l'application est démarrée dans ce processus sur un serveur local
+multi-thread, avec l'encodeur déterministe (ENCODER_BACKEND=hashing, sans téléchargement);
+--url vise un serveur déjà lancé (gunicorn...), --test-client passe par le client de test
+Flask (sans réseau). Les variables d'environnement de app.py (PROGRESSIVE_MATCHING,
+INDEX_BACKEND, SIMILAR_ANIMALS...) s'appliquent au serveur local.
+
+Le rapport donne le débit et les latences p50 / p95 / p99 par route et pour le parcours complet;
+il peut être enregistré puis comparé à une référence pour repérer les régressions.
+
+Usage (depuis la racine du dépôt) :
+    python -m benchmarks.loadtest --adopters 200 --concurrency 16
+    python -m benchmarks.loadtest --size 100000 --save-baseline benchmarks/loadtest_baseline.json
+    python -m benchmarks.loadtest --compare benchmarks/loadtest_baseline.json
+    python -m benchmarks.loadtest --url http://127.0.0.1:5000 --adopters 500 --concurrency 32
+"""
+import argparse
+import http.cookiejar
+import json
+import logging
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from benchmarks.bench_matcher import catalog_csv, quiet, random_answers
+from questions import CHAT_QUESTIONS
+
+FLOW = 'parcours complet'
+RESULTS_TITLE = 'Pet Match | Résultats'.encode('utf-8')
+
+
+class HttpSession:
+    """Navigateur minimal : cookies de session conservés entre les requêtes."""
+
+    def __init__(self, base_url, timeout=60):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+
+    def request(self, method, path, payload=None):
+        """Retourne (statut, corps)."""
+        data = json.dumps(payload).encode('utf-8') if payload is not None else None
+        req = urllib.request.Request(self.base_url + path, data=data, method=method,
+                                     headers={'Content-Type': 'application/json'} if data else {})
+        try:
+            with self.opener.open(req, timeout=self.timeout) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+
+class TestClientSession:
+    """Même interface que HttpSession, via le client de test Flask (sans réseau)."""
+
+    def __init__(self, flask_app):
+        self.client = flask_app.test_client()
+
+    def request(self, method, path, payload=None):
+        response = self.client.open(path, method=method, json=payload)
+        return response.status_code, response.data
+
+
+class Recorder:
+    """Latences collectées par route, partagées entre les threads d'adoptants."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def add(self, route, seconds, ok=True):
+        with self.lock:
+            self.latencies[route].append(seconds)
+            if not ok:
+                self.errors[route] += 1
+
+    def timed(self, session, route, method, path, payload=None):
+        started = time.perf_counter()
+        try:
+            status, body = session.request(method, path, payload)
+        except Exception:
+            self.add(route, time.perf_counter() - started, ok=False)
+            raise
+        self.add(route, time.perf_counter() - started, ok=status < 400)
+        return status, body
+
+
+def run_adopter(session, answers, recorder, poll_interval, max_wait):
+    """Déroule le parcours d'un adoptant, comme le feraient chatbot.html et waiting.html."""
+    started = time.perf_counter()
+    ok = True
+    try:
+        recorder.timed(session, '/start-chat', 'GET', '/start-chat')
+        # Appel initial (première question), puis une réponse par question
+        status, body = recorder.timed(session, '/chat', 'POST', '/chat',
+                                      {'user_answer': 'None', 'current_question_key': None})
+        reply = json.loads(body) if status < 400 else {}
+        for question in CHAT_QUESTIONS:
+            status, body = recorder.timed(session, '/chat', 'POST', '/chat',
+                                          {'user_answer': str(answers[question['key']]),
+                                           'current_question_key': question['key']})
+            reply = json.loads(body) if status < 400 else {}
+            if reply.get('status') != 'continue':
+                break
+        ok = reply.get('status') == 'match_found'
+
+        recorder.timed(session, '/waiting', 'GET', '/waiting')
+        job_id = reply.get('job_id')
+        deadline = time.perf_counter() + max_wait
+        while job_id and time.perf_counter() < deadline:
+            status, body = recorder.timed(session, '/api/jobs/<id>', 'GET', f"/api/jobs/{job_id}")
+            if status >= 400 or 'redirect_url' in json.loads(body):
+                break
+            time.sleep(poll_interval)
+
+        status, body = recorder.timed(session, '/results', 'GET', '/results')
+        # Page de résultats, et non la page d'attente renvoyée si le matching n'est pas terminé
+        ok = ok and status == 200 and RESULTS_TITLE in body
+    except Exception:
+        ok = False
+    recorder.add(FLOW, time.perf_counter() - started, ok=ok)
+
+
+def summarize(recorder, elapsed):
+    """Débit et percentiles (ms) par route."""
+    summary = {}
+    for route, values in recorder.latencies.items():
+        ms = np.array(values) * 1000
+        summary[route] = {
+            'count': len(values),
+            'errors': recorder.errors[route],
+            'per_s': round(len(values) / elapsed, 2),
+            'p50_ms': round(float(np.percentile(ms, 50)), 3),
+            'p95_ms': round(float(np.percentile(ms, 95)), 3),
+            'p99_ms': round(float(np.percentile(ms, 99)), 3),
+        }
+    return summary
+
+
+def compare(current, baseline, threshold):
+    """Affiche les écarts de p95 avec une référence et retourne le nombre de régressions."""
+    regressions = 0
+    print(f"\n{'route':<20}{'réf. p95 ms':>14}{'p95 ms':>12}{'écart':>10}")
+    for route, values in current['routes'].items():
+        reference = baseline.get('routes', {}).get(route)
+        if not reference or not reference.get('p95_ms'):
+            continue
+        change = values['p95_ms'] / reference['p95_ms'] - 1
+        flag = ''
+        if change > threshold:
+            flag = '  ⚠️ régression'
+            regressions += 1
+        print(f"{route:<20}{reference['p95_ms']:>14.3f}{values['p95_ms']:>12.3f}{change:>+10.1%}{flag}")
+    return regressions
+
+
+def local_app(args):
+    """Importe app.py dans ce processus (encodeur hors ligne, catalogue choisi) et attend le matcher."""
+    if not args.real_model:
+        os.environ['ENCODER_BACKEND'] = 'hashing'
+    os.environ['CATALOG_PATH'] = catalog_csv(args.size) if args.size else args.csv
+    os.environ.setdefault('MATCHER_WARMUP', 'sync')
+    with quiet():
+        import app
+        app.MATCHER_READY.wait()
+    if not app.MATCHER:
+        raise SystemExit(f"ERREUR: Le matcher n'a pas pu être initialisé ({app.MATCHER_ERROR}).")
+    return app.app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--adopters', type=int, default=200, help="Nombre d'adoptants simulés")
+    parser.add_argument('--concurrency', type=int, default=16, help="Adoptants simultanés")
+    parser.add_argument('--url', help="Serveur déjà lancé (sinon, serveur local dans ce processus)")
+    parser.add_argument('--test-client', action='store_true', help="Client de test Flask au lieu de HTTP")
+    parser.add_argument('--csv', default='data/animals.csv', help="Catalogue du serveur local (ignoré si --size est donné)")
+    parser.add_argument('--size', type=int, help="Taille d'un catalogue synthétique (voir generate.py)")
+    parser.add_argument('--real-model', action='store_true', help="Utiliser le vrai modèle au lieu de l'encodeur déterministe")
+    parser.add_argument('--poll-interval', type=float, default=0.3, help="Intervalle (s) d'interrogation de /api/jobs")
+    parser.add_argument('--max-wait', type=float, default=60, help="Attente maximale (s) de la tâche de matching")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="Fichier JSON où enregistrer le rapport")
+    parser.add_argument('--save-baseline', help="Enregistre les résultats comme référence (JSON)")
+    parser.add_argument('--compare', help="Compare les résultats à une référence (JSON)")
+    parser.add_argument('--threshold', type=float, default=0.2, help="Écart relatif de p95 signalé comme régression")
+    args = parser.parse_args()
+
+    server = None
+    if args.url:
+        make_session = lambda: HttpSession(args.url)
+        target = args.url
+    else:
+        flask_app = local_app(args)
+        if args.test_client:
+            make_session = lambda: TestClientSession(flask_app)
+            target = 'client de test Flask'
+        else:
+            from werkzeug.serving import make_server
+            # Pas de ligne de journal par requête pendant la mesure
+            logging.getLogger('werkzeug').setLevel(logging.ERROR)
+            server = make_server('127.0.0.1', 0, flask_app, threaded=True)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            base_url = f"http://127.0.0.1:{server.server_port}"
+            make_session = lambda: HttpSession(base_url)
+            target = f"serveur local {base_url}"
+
+    answers_list = random_answers(args.adopters, seed=args.seed)
+    recorder = Recorder()
+    print(f"{args.adopters} adoptants, {args.concurrency} simultanés ({target})...")
+    started = time.perf_counter()
+    with quiet(), ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for answers in answers_list:
+            pool.submit(run_adopter, make_session(), answers, recorder, args.poll_interval, args.max_wait)
+    elapsed = time.perf_counter() - started
+    if server is not None:
+        server.shutdown()
+
+    routes = summarize(recorder, elapsed)
+    print(f"\nDurée {elapsed:.1f}s, {routes[FLOW]['per_s']:.2f} parcours/s, "
+          f"{routes[FLOW]['errors']} parcours en erreur")
+    print(f"{'route':<20}{'requêtes':>10}{'erreurs':>9}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for route in ['/start-chat', '/chat', '/waiting', '/api/jobs/<id>', '/results', FLOW]:
+        if route in routes:
+            r = routes[route]
+            print(f"{route:<20}{r['count']:>10}{r['errors']:>9}{r['per_s']:>9.1f}"
+                  f"{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['p99_ms']:>10.2f}")
+
+    report = {
+        'target': 'url' if args.url else ('test-client' if args.test_client else 'local'),
+        'encoder': 'model' if args.real_model else 'hashing',
+        'catalog': args.size or args.csv,
+        'adopters': args.adopters,
+        'concurrency': args.concurrency,
+        'elapsed_s': round(elapsed, 3),
+        'routes': routes,
+    }
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2, sort_keys=True)
+            print(f"\n✓ Rapport enregistré dans {path}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        print(f"\n{regressions} régression(s) au-delà de {args.threshold:.0%}.")
+        if regressions:
+            raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+Qualité du matching progressif face à l'encodage de la phrase de profil complète.
+
+Pour chaque combinaison de réponses du chatbot, compare :
+    - la similarité cosinus entre le vecteur composé des fragments et celui de la phrase;
+    - le rappel@k du top-k obtenu avec le vecteur composé (index complet);
+    - le rappel@k du matching progressif : shortlist mise à jour réponse après réponse
+      (dans l'ordre de CHAT_QUESTIONS), puis re-score de la shortlist à la dernière réponse.
+La référence est le top-k obtenu avec l'embedding de la phrase complète.
+
+Usage (depuis la racine du dépôt) :
+    python -m benchmarks.progressive_quality --real-model
+    python -m benchmarks.progressive_quality --size 10000 --shortlist-sizes 20 50 200
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+import matching
+from benchmarks.bench_matcher import catalog_csv, quiet
+from encoders import HashingEncoder
+from matching import AnimalMatcher
+from profile_cache import iter_answer_combinations
+from questions import CHAT_QUESTIONS
+from search import normalize_rows
+
+
+def recall(rows, reference):
+    """Part des lignes de référence retrouvées."""
+    return len(set(rows) & set(reference)) / max(len(reference), 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--csv', default='data/animals.csv', help="Catalogue CSV (ignoré si --size est donné)")
+    parser.add_argument('--size', type=int, help="Taille d'un catalogue synthétique (voir generate.py)")
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--shortlist-sizes', type=int, nargs='+', default=[10, 20, 50, 100])
+    parser.add_argument('--combinations', type=int, default=0,
+                        help="Nombre de combinaisons tirées au hasard (0 = toutes)")
+    parser.add_argument('--real-model', action='store_true', help="Utiliser le vrai modèle au lieu de l'encodeur déterministe")
+    args = parser.parse_args()
+
+    if not args.real_model:
+        matching.set_model(HashingEncoder())
+
+    csv_path = catalog_csv(args.size) if args.size else args.csv
+    with quiet():
+        matcher = AnimalMatcher(csv_path=csv_path, n_neighbors=args.k, cache_dir=None)
+        matcher.train_knn()
+        matcher.precompute_fragments(CHAT_QUESTIONS)
+    state = matcher._snapshot()
+
+    combinations = list(iter_answer_combinations(CHAT_QUESTIONS))
+    if args.combinations:
+        combinations = random.Random(0).sample(combinations, min(args.combinations, len(combinations)))
+
+    with quiet():
+        sentences = matching.encode_batch([matcher.create_user_profile(a) for a in combinations],
+                                          show_progress=False)
+
+    cosines, composed_recall = [], []
+    progressive_recall = {size: [] for size in args.shortlist_sizes}
+    sentence_ms, final_ms = [], {size: [] for size in args.shortlist_sizes}
+    for answers, sentence in zip(combinations, sentences):
+        composed = matcher.compose_user_vector(answers)
+        cosines.append(float(normalize_rows(composed)[0] @ normalize_rows(sentence)[0]))
+
+        index = state.indexes[matcher._filter_key(answers)]
+        started = time.perf_counter()
+        with quiet():
+            matching.get_vector(matcher.create_user_profile(answers))
+        reference, _ = matcher._query_index(index, state.vectors, sentence, args.k)
+        sentence_ms.append(1000 * (time.perf_counter() - started))
+
+        rows, _ = matcher._query_index(index, state.vectors, composed, args.k)
+        composed_recall.append(recall(rows, reference))
+
+        for size in args.shortlist_sizes:
+            # Shortlist tenue à jour après chaque réponse, sauf la dernière
+            partial, shortlist = {}, None
+            for question in CHAT_QUESTIONS[:-1]:
+                partial[question['key']] = answers[question['key']]
+                shortlist = matcher.progressive_shortlist(partial, size)
+            started = time.perf_counter()
+            rows, _ = matcher._progressive_rows(state, answers, matcher.compose_user_vector(answers), args.k, shortlist)
+            final_ms[size].append(1000 * (time.perf_counter() - started))
+            progressive_recall[size].append(recall(rows, reference))
+
+    encoder = 'modèle' if args.real_model else 'encodeur déterministe'
+    print(f"\n{len(combinations)} combinaisons, {len(state.df)} animaux, top-{args.k} ({encoder})")
+    print(f"Cosinus vecteur composé / phrase complète : moyenne {np.mean(cosines):.3f}, "
+          f"min {np.min(cosines):.3f}")
+    print(f"Phrase complète (encodage + recherche)  : {np.mean(sentence_ms):.3f} ms par profil")
+    print(f"\n{'méthode':<34}{'rappel@k':>10}{'ms (dernière réponse)':>24}")
+    print(f"{'vecteur composé, index complet':<34}{np.mean(composed_recall):>10.3f}{'-':>24}")
+    for size in args.shortlist_sizes:
+        print(f"{f'progressif, shortlist de {size}':<34}{np.mean(progressive_recall[size]):>10.3f}"
+              f"{np.mean(final_ms[size]):>24.3f}")
+
+
+if __name__ == '__main__':
+    main()
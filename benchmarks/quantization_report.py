@@ -0,0 +1,90 @@
+"""
+Rapport mémoire / précision des index compacts (int8, float16) face à l'index float32 exact.
+
+La mémoire totale d'un index compact avec re-score inclut la matrice float32 lue par le
+re-score; la colonne "index Mo" est ce qui reste propre à chaque processus quand cette
+matrice est memory-mappée (bundle, mémoire partagée, ou fichier du moteur 'quantized' dans
+le dossier de cache, voir AnimalMatcher._map_vectors) et partagée par le cache de pages.
+
+Usage (depuis la racine du dépôt) :
+    python -m benchmarks.quantization_report --n 100000
+    python -m benchmarks.quantization_report --catalog   # embeddings réels de data/animals.csv
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from benchmarks.ann_recall import catalog_vectors, synthetic_vectors
+from search import ExactIndex, QuantizedIndex, rerank
+
+
+def run(index, vectors, queries, k, rerank_factor):
+    """Exécute les requêtes (avec re-score pleine précision si rerank_factor > 0)."""
+    results, scores = [], []
+    started = time.perf_counter()
+    for q in queries:
+        if rerank_factor:
+            rows, _ = index.search(q, k * rerank_factor)
+            rows, s = rerank(vectors[rows], rows, q, k)
+        else:
+            rows, s = index.search(q, k)
+        results.append(rows)
+        scores.append(s)
+    return results, scores, 1000 * (time.perf_counter() - started) / len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--n', type=int, default=100000, help="Taille du catalogue synthétique")
+    parser.add_argument('--dim', type=int, default=384)
+    parser.add_argument('--catalog', action='store_true', help="Utiliser les embeddings de data/animals.csv")
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--rerank', type=int, default=4, help="Facteur de sur-échantillonnage avant re-score")
+    parser.add_argument('--output', help="Fichier JSON où enregistrer le rapport")
+    args = parser.parse_args()
+
+    vectors = catalog_vectors() if args.catalog else synthetic_vectors(args.n, args.dim)
+    vectors = np.asarray(vectors, dtype=np.float32)
+    rows = np.arange(len(vectors))
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.choice(len(vectors), args.queries)] + 0.3 * rng.normal(size=(args.queries, vectors.shape[1]))
+
+    exact = ExactIndex(vectors, rows)
+    truth, truth_scores, exact_ms = run(exact, vectors, queries, args.k, 0)
+    exact_mb = (exact.vectors.nbytes + exact.rows.nbytes) / 1e6
+
+    print(f"Catalogue : {len(vectors)} vecteurs de dimension {vectors.shape[1]}")
+    print(f"{'représentation':<22}{'index Mo':>10}{'total Mo':>10}{'ratio':>8}{'rappel@' + str(args.k):>10}"
+          f"{'err. score':>12}{'ms/requête':>12}")
+    print(f"{'float32 exact':<22}{exact_mb:>10.1f}{exact_mb:>10.1f}{1.0:>8.2f}{1.0:>10.3f}{0.0:>12.5f}{exact_ms:>12.3f}")
+
+    report = {'n': len(vectors), 'dim': int(vectors.shape[1]), 'k': args.k,
+              'exact': {'mb': exact_mb, 'ms': exact_ms}, 'quantized': []}
+    for dtype in ('int8', 'float16'):
+        index = QuantizedIndex(vectors, rows, dtype=dtype)
+        mb = index.nbytes / 1e6
+        for factor in (0, args.rerank):
+            found, scores, ms = run(index, vectors, queries, args.k, factor)
+            recall = np.mean([len(np.intersect1d(a, b)) / len(b) for a, b in zip(found, truth)])
+            error = np.mean([np.abs(a - b).max() for a, b in zip(scores, truth_scores)])
+            # Le re-score garde la matrice float32 du catalogue en plus des codes
+            total_mb = mb + (vectors.nbytes / 1e6 if factor else 0)
+            label = f"{dtype} " + (f"+ re-score x{factor}" if factor else "seul")
+            print(f"{label:<22}{mb:>10.1f}{total_mb:>10.1f}{exact_mb / total_mb:>8.2f}{recall:>10.3f}"
+                  f"{error:>12.5f}{ms:>12.3f}")
+            report['quantized'].append({'dtype': dtype, 'rerank': factor, 'index_mb': mb, 'total_mb': total_mb,
+                                        'recall': float(recall), 'score_error': float(error), 'ms': ms})
+
+    print("Note : avec re-score, seule la colonne \"index Mo\" est propre à chaque processus quand la"
+          " matrice float32 est memory-mappée (voir l'en-tête du module).")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"✓ Rapport enregistré dans {args.output}")
+
+
+if __name__ == '__main__':
+    main()
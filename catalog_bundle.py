@@ -0,0 +1,167 @@
+"""
+Format binaire colonnaire du catalogue.
+
+Un bundle est un dossier contenant :
+    meta.json         modèle, dimension, nombre d'animaux et description des colonnes
+    col_<nom>.npy     une colonne du catalogue (tableau NumPy, chaînes en largeur fixe)
+    embeddings.npy    embeddings normalisés (L2) du catalogue, en float32
+
+Tous les fichiers .npy sont ouverts en memory-map : le démarrage ne parse plus de CSV ni
+ne ré-encode de descriptions, et les pages des embeddings sont partagées entre les
+processus workers par le cache de pages du système.
+
+Les lignes sont triées par espèce pour que les vecteurs de chaque espèce forment une
+tranche contiguë de embeddings.npy (les index par espèce sont alors des vues, pas des copies).
+
+Usage :
+    python catalog_bundle.py data/animals.csv data/animals.bundle
+"""
+import argparse
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from encoders import ENCODER_BACKENDS
+from search import normalize_rows
+
+BUNDLE_FORMAT = 1
+META_FILE = 'meta.json'
+EMBEDDINGS_FILE = 'embeddings.npy'
+
+
+def is_bundle(path):
+    """Indique si `path` est un dossier de catalogue binaire."""
+    return os.path.isdir(path) and os.path.exists(os.path.join(path, META_FILE))
+
+
+def _column_file(name):
+    return f"col_{name}.npy"
+
+
+def _column_array(series):
+    """Tableau NumPy memory-mappable d'une colonne (les objets deviennent des chaînes de largeur fixe)."""
+    if series.dtype.kind in 'biuf':
+        return series.to_numpy(), None
+    if series.dtype.kind == 'M':
+        return series.to_numpy(), None
+    missing = series.isna().to_numpy()
+    values = series.where(~missing, '').astype(str).to_numpy()
+    return np.asarray(values, dtype=str), (missing if missing.any() else None)
+
+
+def sort_by_species(df, vectors):
+    """
+    Trie le catalogue par espèce (tri stable) et normalise ses embeddings.
+
+    Chaque espèce devient une tranche contiguë des vecteurs : les index par espèce
+    peuvent alors en être des vues (voir AnimalMatcher.train_knn).
+    """
+    order = np.argsort(df['species'].str.lower().to_numpy(), kind='stable')
+    return df.iloc[order].reset_index(drop=True), normalize_rows(np.asarray(vectors)[order])
+
+
+def write_bundle(df, vectors, path, model_name, dim):
+    """
+    Écrit le catalogue `df` et ses embeddings `vectors` dans le dossier `path`.
+
+    L'écriture se fait dans un dossier temporaire remplacé d'un bloc, pour que les
+    lecteurs ne voient jamais un bundle à moitié écrit.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.shape != (len(df), dim):
+        raise ValueError(f"Embeddings de forme {vectors.shape} pour {len(df)} animaux (attendu ({len(df)}, {dim})).")
+
+    df, vectors = sort_by_species(df, vectors)
+
+    tmp_path = path.rstrip(os.sep) + '.tmp'
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    columns = []
+    for name in df.columns:
+        values, missing = _column_array(df[name])
+        np.save(os.path.join(tmp_path, _column_file(name)), values)
+        column = {'name': name, 'dtype': values.dtype.str}
+        if missing is not None:
+            # Valeurs manquantes des colonnes texte, restaurées à la lecture
+            column['missing'] = np.flatnonzero(missing).tolist()
+        columns.append(column)
+    np.save(os.path.join(tmp_path, EMBEDDINGS_FILE), vectors)
+
+    with open(os.path.join(tmp_path, META_FILE), 'w', encoding='utf-8') as f:
+        json.dump({'format': BUNDLE_FORMAT, 'model': model_name, 'dim': dim, 'count': len(df),
+                   'normalized': True, 'columns': columns}, f, indent=2)
+
+    old_path = path.rstrip(os.sep) + '.old'
+    shutil.rmtree(old_path, ignore_errors=True)
+    if os.path.exists(path):
+        os.replace(path, old_path)
+    os.replace(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+
+
+def read_bundle(path, model_name=None, dim=None):
+    """
+    Lit un bundle.
+
+    Returns:
+        (df, vectors) : le catalogue et les embeddings normalisés en memory-map (lecture seule).
+        `vectors` vaut None si le bundle a été encodé avec un autre modèle que `model_name`
+        ou une autre dimension que `dim` (les descriptions doivent alors être ré-encodées).
+    """
+    with open(os.path.join(path, META_FILE), 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+    if meta.get('format') != BUNDLE_FORMAT:
+        raise ValueError(f"Format de bundle non pris en charge : {meta.get('format')}.")
+
+    data = {}
+    for column in meta['columns']:
+        values = np.load(os.path.join(path, _column_file(column['name'])), mmap_mode='r')
+        if values.dtype.kind == 'U':
+            values = values.astype(object)
+            values[column.get('missing', [])] = None
+        data[column['name']] = values
+    df = pd.DataFrame(data, columns=[c['name'] for c in meta['columns']])
+
+    vectors = np.load(os.path.join(path, EMBEDDINGS_FILE), mmap_mode='r')
+    if (model_name and meta.get('model') != model_name) or (dim and meta.get('dim') != dim) \
+            or vectors.shape != (len(df), meta.get('dim')):
+        print(f"⚠️ AVERTISSEMENT : Embeddings du bundle '{path}' incompatibles avec le modèle '{model_name}', "
+              "ils seront recalculés.")
+        vectors = None
+    return df, vectors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convertit un catalogue CSV en bundle binaire colonnaire.")
+    parser.add_argument('csv', help="Catalogue CSV source")
+    parser.add_argument('bundle', help="Dossier du bundle à écrire")
+    parser.add_argument('--cache-dir', default='data/cache', help="Dossier du cache d'embeddings")
+    parser.add_argument('--batch-size', type=int, default=64, help="Taille des lots envoyés au modèle")
+    parser.add_argument('--workers', type=int, default=0, help="Nombre de processus d'encodage (0 = processus courant)")
+    parser.add_argument('--encoder', default='transformer', choices=ENCODER_BACKENDS,
+                        help="Moteur d'encodage (voir encoders.py)")
+    parser.add_argument('--encoder-threads', type=int, help="Threads PyTorch de l'encodeur")
+    args = parser.parse_args()
+
+    from embedding_cache import EmbeddingCache
+    from matching import AnimalMatcher, VECTOR_DIMENSION, configure_encoder, encoder_name, get_model
+
+    configure_encoder(args.encoder, args.encoder_threads)
+    matcher = AnimalMatcher(csv_path=args.csv, cache_dir=args.cache_dir,
+                            batch_size=args.batch_size, n_workers=args.workers)
+    descriptions = matcher.df['personality_description'].tolist()
+    cached = args.cache_dir and EmbeddingCache(args.cache_dir, encoder_name(), VECTOR_DIMENSION).covers(descriptions)
+    if not cached and get_model() is None:
+        # Des vecteurs de l'encodeur de secours ne doivent pas être figés dans un bundle
+        raise SystemExit("ERREUR: Modèle d'embeddings indisponible, impossible de construire le bundle.")
+    matcher.prepare_embeddings()
+    write_bundle(matcher.df, matcher.animal_vectors, args.bundle, encoder_name(), VECTOR_DIMENSION)
+    print(f"✓ Bundle de {len(matcher.df)} animaux écrit dans {args.bundle}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,195 @@
+import glob
+import hashlib
+import json
+import os
+import re
+import uuid
+
+import numpy as np
+
+
+class EmbeddingCache:
+    """
+    Cache disque des embeddings de descriptions.
+
+    Chaque vecteur est indexé par un hash du nom du modèle et du texte encodé.
+    Le cache est une suite de segments en ajout seul : chaque lot de descriptions
+    nouvelles est écrit dans son propre fichier .npy (chargé en memory-map), avec
+    la liste de ses clés dans un fichier JSON à côté. Un ajout coûte donc la taille
+    du lot, pas celle du cache; les segments sont fusionnés quand ils deviennent trop
+    nombreux, et les entrées qui ne sont plus au catalogue sont alors éliminées
+    (voir compact).
+
+    Plusieurs processus (workers gunicorn) peuvent partager le même dossier : chaque
+    segment reçoit un numéro réservé de manière atomique, est écrit sous des noms temporaires
+    propres à l'écrivain, et n'est visible des autres qu'une fois son fichier JSON en place.
+    """
+
+    def __init__(self, cache_dir="data/cache", model_name="all-MiniLM-L6-v2", dim=384, max_segments=16):
+        self.cache_dir = cache_dir
+        self.model_name = model_name
+        self.dim = dim
+        self.max_segments = max_segments
+        self.safe_name = model_name.replace('/', '_')
+        self.segments = []
+        self.index = {}
+        self.load()
+
+    def key(self, text):
+        """Hash de contenu d'une description pour ce modèle."""
+        payload = f"{self.model_name}\x00{text}".encode('utf-8')
+        return hashlib.sha1(payload).hexdigest()
+
+    def _segment_paths(self, number):
+        base = os.path.join(self.cache_dir, f"embeddings_{self.safe_name}.{number:06d}")
+        return base + '.npy', base + '.json'
+
+    def _segment_numbers(self):
+        """Numéros des segments complets présents sur disque (le fichier JSON est écrit en dernier)."""
+        pattern = re.compile(rf"embeddings_{re.escape(self.safe_name)}\.(\d+)\.json$")
+        numbers = []
+        for path in glob.glob(os.path.join(glob.escape(self.cache_dir), f"embeddings_{glob.escape(self.safe_name)}.*.json")):
+            match = pattern.search(os.path.basename(path))
+            if match:
+                numbers.append(int(match.group(1)))
+        return sorted(numbers)
+
+    def load(self):
+        """Charge les segments existants (en memory-map), en ignorant ceux qui sont illisibles ou incohérents."""
+        self.segments = []
+        self.index = {}
+        for number in self._segment_numbers():
+            vectors_path, keys_path = self._segment_paths(number)
+            try:
+                with open(keys_path, 'r', encoding='utf-8') as f:
+                    meta = json.load(f)
+                vectors = np.load(vectors_path, mmap_mode='r')
+            except FileNotFoundError:
+                # Segment supprimé entre-temps par la compaction d'un autre processus
+                continue
+            except (OSError, ValueError) as e:
+                print(f"⚠️ AVERTISSEMENT : Segment {number} du cache d'embeddings illisible, ignoré ({e}).")
+                continue
+
+            keys = meta.get('keys', [])
+            if meta.get('model') != self.model_name or vectors.shape != (len(keys), self.dim):
+                print(f"⚠️ AVERTISSEMENT : Segment {number} du cache d'embeddings incohérent, ignoré.")
+                continue
+
+            segment = len(self.segments)
+            self.segments.append((number, vectors))
+            for row, k in enumerate(keys):
+                self.index[k] = (segment, row)
+
+    def _reserve_segment(self):
+        """
+        Réserve le prochain numéro de segment libre : le fichier .npy est créé en mode exclusif,
+        si bien que deux processus qui ajoutent en même temps n'obtiennent jamais le même numéro.
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        numbers = self._segment_numbers()
+        number = (numbers[-1] + 1) if numbers else 0
+        while True:
+            try:
+                os.close(os.open(self._segment_paths(number)[0], os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                return number
+            except FileExistsError:
+                number += 1
+
+    def _write_segment(self, vectors, keys):
+        """
+        Écrit un segment de manière atomique (vecteurs puis clés) sous un numéro réservé.
+
+        Returns:
+            (numéro, vecteurs en memory-map) : le memory-map est ouvert avant la publication du
+            fichier JSON, il reste donc valide même si un autre processus compacte le segment.
+        """
+        number = self._reserve_segment()
+        vectors_path, keys_path = self._segment_paths(number)
+        # Noms temporaires propres à cet écrivain (processus ou thread)
+        tmp = f".{uuid.uuid4().hex}.tmp"
+        np.save(vectors_path + tmp + '.npy', np.asarray(vectors, dtype=np.float32))
+        os.replace(vectors_path + tmp + '.npy', vectors_path)
+        mapped = np.load(vectors_path, mmap_mode='r')
+        with open(keys_path + tmp, 'w', encoding='utf-8') as f:
+            json.dump({'model': self.model_name, 'dim': self.dim, 'keys': keys}, f)
+        os.replace(keys_path + tmp, keys_path)
+        return number, mapped
+
+    def _remove_segment(self, number):
+        for path in reversed(self._segment_paths(number)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def append(self, vectors, keys):
+        """Ajoute un segment contenant `vectors` (clés `keys`) sans réécrire les segments existants."""
+        # Seul le nouveau segment est ouvert : les autres restent tels quels en mémoire
+        segment = len(self.segments)
+        self.segments.append(self._write_segment(vectors, keys))
+        for row, k in enumerate(keys):
+            self.index[k] = (segment, row)
+
+    def compact(self, keep_texts=None):
+        """
+        Fusionne tous les segments en un seul. Avec `keep_texts`, seules les entrées de ces
+        descriptions sont conservées (les autres, ex. animaux adoptés, sont éliminées).
+        """
+        keys = list(self.index)
+        if keep_texts is not None:
+            wanted = {self.key(t) for t in keep_texts}
+            keys = [k for k in keys if k in wanted]
+        vectors = self._gather(keys)
+        old_numbers = [number for number, _ in self.segments]
+        # L'état en mémoire est repris du segment écrit, sans relire le dossier : les segments
+        # ajoutés entre-temps par d'autres processus restent sur disque pour le prochain chargement
+        self.segments = [self._write_segment(vectors, keys)]
+        self.index = {k: (0, row) for row, k in enumerate(keys)}
+        for number in old_numbers:
+            self._remove_segment(number)
+
+    def _gather(self, keys):
+        """Vecteurs des clés `keys` (toutes présentes), dans l'ordre."""
+        vectors = np.empty((len(keys), self.dim), dtype=np.float32)
+        if not keys:
+            return vectors
+        located = np.array([self.index[k] for k in keys], dtype=np.int64).reshape(-1, 2)
+        for segment, (_, segment_vectors) in enumerate(self.segments):
+            mask = located[:, 0] == segment
+            if mask.any():
+                vectors[mask] = segment_vectors[located[mask, 1]]
+        return vectors
+
+    def covers(self, texts):
+        """Indique si toutes les descriptions sont déjà en cache."""
+        return all(self.key(t) in self.index for t in texts)
+
+    def get_many(self, texts, encode_fn, prune=False):
+        """
+        Retourne les embeddings de `texts` dans l'ordre.
+
+        Seules les descriptions absentes du cache sont passées à `encode_fn`
+        (liste de textes -> tableau (n, dim)) puis ajoutées dans un nouveau segment.
+        Avec `prune=True` (`texts` est alors le catalogue complet), les entrées absentes
+        de `texts` sont éliminées dès qu'elles dépassent la taille du catalogue.
+        """
+        keys = [self.key(t) for t in texts]
+
+        missing = {}
+        for k, t in zip(keys, texts):
+            if k not in self.index and k not in missing:
+                missing[k] = t
+
+        if missing:
+            print(f"Encodage de {len(missing)} nouvelles descriptions ({len(self.index)} déjà en cache)...")
+            new_vectors = np.asarray(encode_fn(list(missing.values())), dtype=np.float32)
+            self.append(new_vectors.reshape(-1, self.dim), list(missing.keys()))
+        else:
+            print(f"✓ Les {len(keys)} embeddings ont été chargés depuis le cache.")
+
+        if prune and len(self.index) > 2 * len(set(keys)):
+            self.compact(texts)
+        elif len(self.segments) > self.max_segments:
+            self.compact()
+        return self._gather(keys)
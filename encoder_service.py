@@ -0,0 +1,130 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+
+import metrics
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+ENCODER_BATCH_SIZE = metrics.REGISTRY.histogram(
+    'petmatch_encoder_batch_size', "Nombre de textes par passe du modèle (micro-batching).",
+    buckets=BATCH_SIZE_BUCKETS)
+ENCODER_WAIT_SECONDS = metrics.REGISTRY.histogram(
+    'petmatch_encoder_wait_seconds', "Attente d'un texte dans la file avant son passage dans le modèle.")
+ENCODER_BATCH_SECONDS = metrics.REGISTRY.histogram(
+    'petmatch_encoder_batch_seconds', "Durée d'une passe du modèle sur un lot.")
+
+
+class BatchingEncoder:
+    """
+    Service d'encodage par micro-lots devant le modèle NLP.
+
+    Les requêtes concurrentes déposent leur texte dans une file; un thread unique les
+    regroupe et appelle `encode_fn` (liste de textes -> tableau (n, dim)) une fois par lot,
+    dès que `max_batch_size` textes attendent ou que le plus ancien a attendu `max_wait_ms`.
+    Un CPU encode bien plus de textes par seconde en un lot qu'en passes d'un seul texte.
+    """
+
+    def __init__(self, encode_fn, max_batch_size=32, max_wait_ms=5.0):
+        self.encode_fn = encode_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.queue = deque()
+        self.condition = threading.Condition()
+        self.closed = False
+        # Statistiques pour régler la fenêtre d'attente et la taille des lots
+        self.stats_lock = threading.Lock()
+        self.n_batches = 0
+        self.n_texts = 0
+        self.encode_seconds = 0.0
+        self.waits = deque(maxlen=2048)
+        self.thread = threading.Thread(target=self._run, name='batching-encoder', daemon=True)
+        self.thread.start()
+
+    def submit(self, text):
+        """Dépose un texte à encoder et retourne un Future (résultat : vecteur float32)."""
+        future = Future()
+        with self.condition:
+            if self.closed:
+                raise RuntimeError("Service d'encodage arrêté.")
+            self.queue.append((text, future, time.perf_counter()))
+            self.condition.notify()
+        return future
+
+    def encode(self, text, timeout=None):
+        """Encode un texte en attendant le passage de son lot (API synchrone)."""
+        return self.submit(text).result(timeout)
+
+    def _next_batch(self):
+        """Attend le premier texte, puis complète le lot jusqu'à la taille maximale ou l'échéance."""
+        with self.condition:
+            while not self.queue and not self.closed:
+                self.condition.wait()
+            if not self.queue:
+                return None
+            deadline = self.queue[0][2] + self.max_wait
+            while len(self.queue) < self.max_batch_size and not self.closed:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self.condition.wait(remaining)
+            size = min(len(self.queue), self.max_batch_size)
+            return [self.queue.popleft() for _ in range(size)]
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            self._encode(batch)
+
+    def _encode(self, batch):
+        started = time.perf_counter()
+        # Les textes identiques d'un même lot ne sont encodés qu'une fois
+        positions = {}
+        for text, _, _ in batch:
+            positions.setdefault(text, len(positions))
+        try:
+            vectors = np.asarray(self.encode_fn(list(positions)), dtype=np.float32)
+        except Exception as e:
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+        elapsed = time.perf_counter() - started
+
+        for text, future, queued_at in batch:
+            future.set_result(vectors[positions[text]])
+            ENCODER_WAIT_SECONDS.observe(started - queued_at)
+        ENCODER_BATCH_SIZE.observe(len(batch))
+        ENCODER_BATCH_SECONDS.observe(elapsed)
+        with self.stats_lock:
+            self.n_batches += 1
+            self.n_texts += len(batch)
+            self.encode_seconds += elapsed
+            self.waits.extend(started - queued_at for _, _, queued_at in batch)
+
+    def stats(self):
+        """Débit et latences du service (taille moyenne des lots, attente p50/p95 en ms...)."""
+        with self.stats_lock:
+            waits = np.array(self.waits) * 1000 if self.waits else np.zeros(1)
+            return {
+                'batches': self.n_batches,
+                'texts': self.n_texts,
+                'mean_batch_size': round(self.n_texts / self.n_batches, 2) if self.n_batches else 0,
+                'texts_per_s': round(self.n_texts / self.encode_seconds, 1) if self.encode_seconds else 0,
+                'wait_ms_p50': round(float(np.percentile(waits, 50)), 3),
+                'wait_ms_p95': round(float(np.percentile(waits, 95)), 3),
+                'queued': len(self.queue),
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000,
+            }
+
+    def close(self):
+        """Arrête le service après avoir encodé les textes déjà en file."""
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        self.thread.join()
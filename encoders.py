@@ -0,0 +1,164 @@
+"""
+Encodeurs de texte interchangeables pour le matching.
+
+Tous exposent la même interface que SentenceTransformer :
+    encode(textes, batch_size=..., show_progress_bar=...) -> tableau (n, dim) (ou (dim,) pour un texte)
+et un attribut `name`, qui sert de clé aux caches d'embeddings (deux encodeurs ne partagent
+jamais leurs vecteurs).
+
+Moteurs disponibles (voir matching.configure_encoder et benchmarks/encoder_report.py) :
+    transformer  modèle SentenceTransformer téléchargé (qualité de référence)
+    quantized    même modèle, couches linéaires quantifiées en int8 (CPU), threads réglables
+    hashing      n-grammes de mots et de caractères hachés : déterministe, sans téléchargement
+"""
+import hashlib
+import re
+from collections import Counter
+from functools import lru_cache
+
+import numpy as np
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def _set_threads(num_threads):
+    """Fixe le nombre de threads de PyTorch (None : valeur par défaut)."""
+    if not num_threads:
+        return
+    import torch
+    torch.set_num_threads(num_threads)
+
+
+class TransformerEncoder:
+    """Modèle SentenceTransformer (téléchargé au premier chargement)."""
+
+    def __init__(self, model_name='all-MiniLM-L6-v2', num_threads=None, device=None):
+        from sentence_transformers import SentenceTransformer
+        _set_threads(num_threads)
+        self.model = SentenceTransformer(model_name, device=device)
+        self.name = self.cache_name(model_name)
+        self.dim = self.model.get_sentence_embedding_dimension()
+
+    @staticmethod
+    def cache_name(model_name, dim=None):
+        return model_name
+
+    def encode(self, texts, batch_size=32, show_progress_bar=False, **kwargs):
+        return self.model.encode(texts, batch_size=batch_size, show_progress_bar=show_progress_bar, **kwargs)
+
+
+class QuantizedTransformerEncoder(TransformerEncoder):
+    """
+    Modèle SentenceTransformer dont les couches linéaires sont quantifiées dynamiquement en int8.
+
+    Sur CPU, l'inférence est en général nettement plus rapide pour une qualité proche;
+    `num_threads` limite les threads de PyTorch (utile avec plusieurs workers par machine).
+    """
+
+    def __init__(self, model_name='all-MiniLM-L6-v2', num_threads=None):
+        import torch
+        super().__init__(model_name, num_threads=num_threads, device='cpu')
+        self.model = torch.quantization.quantize_dynamic(self.model, {torch.nn.Linear}, dtype=torch.qint8)
+        self.name = self.cache_name(model_name)
+
+    @staticmethod
+    def cache_name(model_name, dim=None):
+        return f"{model_name}-qint8"
+
+
+@lru_cache(maxsize=200000)
+def _feature_hash(feature):
+    return int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+class HashingEncoder:
+    """
+    Encodeur déterministe sans téléchargement : n-grammes hachés dans `dim` cases.
+
+    Chaque texte est décrit par ses mots, ses paires de mots consécutifs et les n-grammes de
+    caractères de ses mots (robustes aux flexions : « énergique » / « énergiques »). Chaque
+    n-gramme est haché vers une case avec un signe (±1), pondéré par 1 + log(occurrences),
+    et le vecteur est normalisé (L2). Bien moins fin que le modèle, mais très rapide et
+    toujours disponible. Les poids sont fixes (pas d'IDF appris) : un même texte donne le même
+    vecteur quel que soit le catalogue, ce qui permet de le mettre en cache.
+    """
+
+    def __init__(self, dim=384, char_ngrams=(3, 5), char_weight=0.5):
+        self.dim = dim
+        self.char_ngrams = char_ngrams
+        self.char_weight = char_weight
+        self.name = self.cache_name(None, dim)
+        # Contribution des n-grammes de caractères de chaque mot (cases, poids signés)
+        self._word_cache = {}
+
+    @staticmethod
+    def cache_name(model_name=None, dim=384):
+        return f"hashing-ngram-{dim}"
+
+    def _bucket(self, feature):
+        h = _feature_hash(feature)
+        return (h >> 1) % self.dim, (1.0 if h & 1 else -1.0)
+
+    def _word_features(self, word):
+        cached = self._word_cache.get(word)
+        if cached is None:
+            low, high = self.char_ngrams
+            padded = f"<{word}>"
+            grams = Counter(f"#{padded[i:i + n]}" for n in range(low, high + 1)
+                            for i in range(len(padded) - n + 1))
+            buckets = [self._bucket(g) for g in grams]
+            cached = (np.array([b for b, _ in buckets], dtype=np.intp),
+                      np.array([sign * self.char_weight * (1.0 + np.log(count))
+                                for (_, sign), count in zip(buckets, grams.values())], dtype=np.float32))
+            if len(self._word_cache) < 100000:
+                self._word_cache[word] = cached
+        return cached
+
+    def _encode_one(self, text, out):
+        words = _TOKEN_RE.findall(text.lower())
+        features = Counter(words)
+        features.update(f"{a} {b}" for a, b in zip(words, words[1:]))
+        for feature, count in features.items():
+            bucket, sign = self._bucket(feature)
+            out[bucket] += sign * (1.0 + np.log(count))
+        for word in set(words):
+            buckets, weights = self._word_features(word)
+            np.add.at(out, buckets, weights)
+        norm = np.linalg.norm(out)
+        if norm:
+            out /= norm
+
+    def encode(self, texts, batch_size=32, show_progress_bar=False, **kwargs):
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            self._encode_one(text, vectors[i])
+        return vectors[0] if single else vectors
+
+
+# Moteurs d'encodage disponibles (paramètre `backend` de matching.configure_encoder)
+ENCODER_BACKENDS = {
+    'transformer': TransformerEncoder,
+    'quantized': QuantizedTransformerEncoder,
+    'hashing': HashingEncoder,
+}
+
+
+def _backend_class(backend):
+    if backend not in ENCODER_BACKENDS:
+        raise ValueError(f"Encodeur inconnu : '{backend}' (choix : {', '.join(ENCODER_BACKENDS)}).")
+    return ENCODER_BACKENDS[backend]
+
+
+def encoder_cache_name(backend, model_name, dim):
+    """Nom (clé de cache) de l'encodeur `backend`, connu sans le charger."""
+    return _backend_class(backend).cache_name(model_name, dim)
+
+
+def create_encoder(backend, model_name, dim, num_threads=None):
+    """Charge l'encodeur `backend` (peut lever une exception si le modèle est indisponible)."""
+    cls = _backend_class(backend)
+    if cls is HashingEncoder:
+        return HashingEncoder(dim)
+    return cls(model_name, num_threads=num_threads)
@@ -1,169 +1,261 @@
-from faker import Faker
+import argparse
+from datetime import date, timedelta
+import multiprocessing
+import os
 import random
+
+from faker import Faker
 import pandas as pd
 
 fake = Faker()
 
-def generate_animals(n=50):
-    dog_breeds = ["Labrador", "Beagle", "Bulldog", "Poodle", "Shepherd", "Golden Retriever", "Husky", "Chihuahua"]
-    cat_breeds = ["Persian", "Siamese", "Maine Coon", "Sphynx", "Bengal", "Ragdoll", "British Shorthair", "Tabby"]
-    colors = ["black", "white", "brown", "grey", "gold", "mixed", "cream", "orange"]
-
-    def rand_species(): 
-        return random.choice(["Dog", "Cat"])
-    
-    def rand_age(): 
-        return round(random.uniform(0.2, 15.0), 1)
-    
-    def rand_sex(): 
-        return random.choice(["M", "F"])
-    
-    def rand_color(): 
-        return random.choice(colors)
-    
-    def rand_date(): 
-        return fake.date_between(start_date="-2y", end_date="today").isoformat()
-
-    def rand_weight(species):
-        if species == "Dog":
-            return round(random.uniform(3.0, 45.0), 2)
-        else:  # Cat
-            return round(random.uniform(2.0, 8.0), 2)
-
-    def generate_personality_profile(species, breed, age, sex):
-        """Generate rich, detailed personality description for NLP embeddings"""
-        
-        # Energy descriptors
-        energy_descriptors = {
-            "high": ["very energetic", "loves to run and play", "always on the move", "needs lots of exercise", 
-                    "bounces with excitement", "thrives on activity"],
-            "medium": ["moderately active", "enjoys regular playtime", "balanced energy", "playful but not hyperactive",
-                      "likes both play and rest"],
-            "low": ["calm and relaxed", "prefers lounging", "gentle and peaceful", "enjoys quiet time",
-                   "mellowed with age", "sedentary lifestyle"]
-        }
-        
-        # Friendliness descriptors
-        friendliness_descriptors = {
-            "high": ["extremely affectionate", "loves everyone they meet", "craves human attention", 
-                    "tail wags constantly", "seeks out cuddles", "very sociable", "great with families"],
-            "medium": ["friendly but selective", "warms up after introduction", "moderately social",
-                      "affectionate with trusted people", "balanced temperament"],
-            "low": ["independent spirit", "prefers solitude", "takes time to trust", "reserved personality",
-                   "selective with affection", "needs patient owner"]
-        }
-        
-        # Special traits based on species
-        dog_traits = [
-            "loves fetch and outdoor games", "excellent walking companion", "enjoys car rides",
-            "responds well to training", "protective of family", "good with children",
-            "needs mental stimulation", "loves treats and food puzzles", "barks to communicate",
-            "enjoys dog parks and socializing", "loyal companion", "needs daily exercise"
-        ]
-        
-        cat_traits = [
-            "enjoys climbing and perching high", "loves to chase toys", "purrs when content",
-            "independent but loving", "enjoys window watching", "playful with laser pointers",
-            "uses scratching post regularly", "curious about everything", "loves cozy spots",
-            "gentle with children", "enjoys quiet environments", "grooms meticulously"
-        ]
-        
-        # Age-based traits
-        if age < 2:
-            age_traits = ["young and still learning", "puppy/kitten energy", "needs training and guidance",
-                         "very playful", "teething phase", "exploring the world"]
-        elif age < 7:
-            age_traits = ["in their prime", "fully grown", "established personality", "mature behavior",
-                         "settled into routines"]
-        else:
-            age_traits = ["senior with wisdom", "calmer with age", "set in their ways", "mature companion",
-                         "gentle soul", "experienced pet"]
-        
-        # Generate random characteristics
-        energy_level = random.choice(["high", "medium", "low"])
-        friendliness_level = random.choice(["high", "medium", "low"])
-        
-        energy_desc = random.choice(energy_descriptors[energy_level])
-        friend_desc = random.choice(friendliness_descriptors[friendliness_level])
-        species_traits = random.sample(dog_traits if species == "Dog" else cat_traits, k=3)
-        age_desc = random.choice(age_traits)
-        
-        # Additional personality elements
-        likes = random.choice([
-            "loves belly rubs", "enjoys being brushed", "loves mealtime", "enjoys napping in sunbeams",
-            "loves interactive play", "enjoys gentle petting", "loves outdoor adventures", "enjoys quiet companionship"
-        ])
-        
-        ideal_home = random.choice([
-            "Would thrive in an active household", "Perfect for a quiet home", 
-            "Great for families with kids", "Ideal for single owner", 
-            "Best with experienced pet owners", "Wonderful for first-time owners",
-            "Suited for apartment living", "Needs a home with a yard"
-        ])
-        
-        # Construct rich personality description
-        description = (
-            f"This {age}-year-old {breed} {species.lower()} is {energy_desc} and {friend_desc}. "
-            f"{age_desc.capitalize()}. {' '.join(species_traits)}. {likes}. "
-            f"{ideal_home}. {'He' if sex == 'M' else 'She'} would make a wonderful addition to the right home."
-        )
-        
-        # Calculate numerical levels for reference (1-10 scale)
-        energy_numeric = {"high": random.uniform(7, 10), "medium": random.uniform(4, 7), "low": random.uniform(1, 4)}
-        friendliness_numeric = {"high": random.uniform(7, 10), "medium": random.uniform(4, 7), "low": random.uniform(1, 4)}
-        
-        return {
-            "description": description,
-            "energy_level": round(energy_numeric[energy_level], 1),
-            "friendliness_level": round(friendliness_numeric[friendliness_level], 1)
-        }
-
-    rows = []
-    for i in range(n):
-        species = rand_species()
-        breed = random.choice(dog_breeds if species == "Dog" else cat_breeds)
-        name = random.choice(["Bella", "Max", "Luna", "Charlie", "Milo", "Coco", "Lucy", "Rocky", 
-                            "Oliver", "Daisy", "Leo", "Sophie", "Shadow", "Whiskers", "Duke", "Princess",
-                            "Buddy", "Molly", "Zeus", "Nala", "Oscar", "Lily", "Simba", "Chloe"])
-        age = rand_age()
-        sex = rand_sex()
-        color = rand_color()
-        
-        # Generate rich personality profile
-        profile = generate_personality_profile(species, breed, age, sex)
-        
-        # Generate image URL
-        image_url = f"https://placeCats.com/{200+i}/{200+i}" if species == "Cat" \
-                    else f"https://placedog.net/{200+i}"
-
-        row = {
-            "id": i + 1,
-            "name": name,
-            "species": species,
-            "breed": breed,
-            "age_years": age,
-            "sex": sex,
-            "color": color,
-            "weight_kg": rand_weight(species),
-            "arrival_date": rand_date(),
-            "vaccinated": random.choice([True, False]),
-            "microchipped": random.choice([True, False]),
-            "energy_level": profile["energy_level"],
-            "friendliness_level": profile["friendliness_level"],
-            "personality_description": profile["description"],
-            "image_url": image_url
-        }
-        rows.append(row)
-
-    return pd.DataFrame(rows)
+DOG_BREEDS = ["Labrador", "Beagle", "Bulldog", "Poodle", "Shepherd", "Golden Retriever", "Husky", "Chihuahua"]
+CAT_BREEDS = ["Persian", "Siamese", "Maine Coon", "Sphynx", "Bengal", "Ragdoll", "British Shorthair", "Tabby"]
+COLORS = ["black", "white", "brown", "grey", "gold", "mixed", "cream", "orange"]
+NAMES = ["Bella", "Max", "Luna", "Charlie", "Milo", "Coco", "Lucy", "Rocky",
+         "Oliver", "Daisy", "Leo", "Sophie", "Shadow", "Whiskers", "Duke", "Princess",
+         "Buddy", "Molly", "Zeus", "Nala", "Oscar", "Lily", "Simba", "Chloe"]
+# Arrival dates cover the two years before this fixed date, so a seeded run gives the same file any day
+ARRIVAL_END_DATE = date(2025, 1, 1)
+ARRIVAL_START_DATE = ARRIVAL_END_DATE - timedelta(days=730)
+
+
+def rand_weight(species, rng=random):
+    if species == "Dog":
+        return round(rng.uniform(3.0, 45.0), 2)
+    else:  # Cat
+        return round(rng.uniform(2.0, 8.0), 2)
+
+
+def generate_personality_profile(species, breed, age, sex, rng=random):
+    """Generate rich, detailed personality description for NLP embeddings"""
+
+    # Energy descriptors
+    energy_descriptors = {
+        "high": ["very energetic", "loves to run and play", "always on the move", "needs lots of exercise", 
+                "bounces with excitement", "thrives on activity"],
+        "medium": ["moderately active", "enjoys regular playtime", "balanced energy", "playful but not hyperactive",
+                  "likes both play and rest"],
+        "low": ["calm and relaxed", "prefers lounging", "gentle and peaceful", "enjoys quiet time",
+               "mellowed with age", "sedentary lifestyle"]
+    }
+
+    # Friendliness descriptors
+    friendliness_descriptors = {
+        "high": ["extremely affectionate", "loves everyone they meet", "craves human attention", 
+                "tail wags constantly", "seeks out cuddles", "very sociable", "great with families"],
+        "medium": ["friendly but selective", "warms up after introduction", "moderately social",
+                  "affectionate with trusted people", "balanced temperament"],
+        "low": ["independent spirit", "prefers solitude", "takes time to trust", "reserved personality",
+               "selective with affection", "needs patient owner"]
+    }
+
+    # Special traits based on species
+    dog_traits = [
+        "loves fetch and outdoor games", "excellent walking companion", "enjoys car rides",
+        "responds well to training", "protective of family", "good with children",
+        "needs mental stimulation", "loves treats and food puzzles", "barks to communicate",
+        "enjoys dog parks and socializing", "loyal companion", "needs daily exercise"
+    ]
+
+    cat_traits = [
+        "enjoys climbing and perching high", "loves to chase toys", "purrs when content",
+        "independent but loving", "enjoys window watching", "playful with laser pointers",
+        "uses scratching post regularly", "curious about everything", "loves cozy spots",
+        "gentle with children", "enjoys quiet environments", "grooms meticulously"
+    ]
+
+    # Age-based traits
+    if age < 2:
+        age_traits = ["young and still learning", "puppy/kitten energy", "needs training and guidance",
+                     "very playful", "teething phase", "exploring the world"]
+    elif age < 7:
+        age_traits = ["in their prime", "fully grown", "established personality", "mature behavior",
+                     "settled into routines"]
+    else:
+        age_traits = ["senior with wisdom", "calmer with age", "set in their ways", "mature companion",
+                     "gentle soul", "experienced pet"]
+
+    # Generate random characteristics
+    energy_level = rng.choice(["high", "medium", "low"])
+    friendliness_level = rng.choice(["high", "medium", "low"])
+
+    energy_desc = rng.choice(energy_descriptors[energy_level])
+    friend_desc = rng.choice(friendliness_descriptors[friendliness_level])
+    species_traits = rng.sample(dog_traits if species == "Dog" else cat_traits, k=3)
+    age_desc = rng.choice(age_traits)
+
+    # Additional personality elements
+    likes = rng.choice([
+        "loves belly rubs", "enjoys being brushed", "loves mealtime", "enjoys napping in sunbeams",
+        "loves interactive play", "enjoys gentle petting", "loves outdoor adventures", "enjoys quiet companionship"
+    ])
+
+    ideal_home = rng.choice([
+        "Would thrive in an active household", "Perfect for a quiet home", 
+        "Great for families with kids", "Ideal for single owner", 
+        "Best with experienced pet owners", "Wonderful for first-time owners",
+        "Suited for apartment living", "Needs a home with a yard"
+    ])
+
+    # Construct rich personality description
+    description = (
+        f"This {age}-year-old {breed} {species.lower()} is {energy_desc} and {friend_desc}. "
+        f"{age_desc.capitalize()}. {' '.join(species_traits)}. {likes}. "
+        f"{ideal_home}. {'He' if sex == 'M' else 'She'} would make a wonderful addition to the right home."
+    )
+
+    # Calculate numerical levels for reference (1-10 scale)
+    energy_numeric = {"high": rng.uniform(7, 10), "medium": rng.uniform(4, 7), "low": rng.uniform(1, 4)}
+    friendliness_numeric = {"high": rng.uniform(7, 10), "medium": rng.uniform(4, 7), "low": rng.uniform(1, 4)}
+
+    return {
+        "description": description,
+        "energy_level": round(energy_numeric[energy_level], 1),
+        "friendliness_level": round(friendliness_numeric[friendliness_level], 1)
+    }
+
+
+def generate_row(i, rng=random, faker=fake):
+    """Generate the animal at 0-based position i using the given random sources"""
+    species = rng.choice(["Dog", "Cat"])
+    breed = rng.choice(DOG_BREEDS if species == "Dog" else CAT_BREEDS)
+    name = rng.choice(NAMES)
+    age = round(rng.uniform(0.2, 15.0), 1)
+    sex = rng.choice(["M", "F"])
+    color = rng.choice(COLORS)
+
+    # Generate rich personality profile
+    profile = generate_personality_profile(species, breed, age, sex, rng)
+
+    # Generate image URL
+    image_url = f"https://placeCats.com/{200+i}/{200+i}" if species == "Cat" \
+                else f"https://placedog.net/{200+i}"
+
+    return {
+        "id": i + 1,
+        "name": name,
+        "species": species,
+        "breed": breed,
+        "age_years": age,
+        "sex": sex,
+        "color": color,
+        "weight_kg": rand_weight(species, rng),
+        "arrival_date": faker.date_between(start_date=ARRIVAL_START_DATE, end_date=ARRIVAL_END_DATE).isoformat(),
+        "vaccinated": rng.choice([True, False]),
+        "microchipped": rng.choice([True, False]),
+        "energy_level": profile["energy_level"],
+        "friendliness_level": profile["friendliness_level"],
+        "personality_description": profile["description"],
+        "image_url": image_url
+    }
+
+
+def empty_catalog():
+    """Catalog with no rows but the usual columns (taken from one generated row)"""
+    return pd.DataFrame(columns=list(generate_row(0, random.Random(0), Faker()).keys()))
+
+
+def generate_animals(n=50, seed=None):
+    """Generate n animals in memory (seed=None keeps the global, unseeded random state)"""
+    if n <= 0:
+        return empty_catalog()
+    if seed is None:
+        return pd.DataFrame([generate_row(i) for i in range(n)])
+    return pd.concat(iter_animal_chunks(n, seed=seed), ignore_index=True)
+
+
+def generate_chunk(args):
+    """
+    Generate one chunk of rows.
+
+    Each chunk has its own random sources derived from (seed, chunk_index), so the
+    output only depends on the seed and the chunk size, never on the number of workers.
+    """
+    chunk_index, start, count, seed = args
+    rng = random.Random(f"{seed}-{chunk_index}")
+    faker = Faker()
+    faker.seed_instance(rng.getrandbits(32))
+    return pd.DataFrame([generate_row(i, rng, faker) for i in range(start, start + count)])
+
+
+def iter_animal_chunks(n, chunk_size=10000, seed=0, workers=1):
+    """Yield the catalog as DataFrames of at most chunk_size rows, in id order"""
+    tasks = [(index, start, min(chunk_size, n - start), seed)
+             for index, start in enumerate(range(0, n, chunk_size))]
+    if workers > 1:
+        with multiprocessing.get_context('spawn').Pool(workers) as pool:
+            # imap keeps chunk order while workers run ahead
+            yield from pool.imap(generate_chunk, tasks)
+    else:
+        for task in tasks:
+            yield generate_chunk(task)
+
+
+def write_animals(path, n, fmt="csv", chunk_size=10000, seed=0, workers=1):
+    """Stream a generated catalog to disk chunk by chunk (csv or parquet)"""
+    if fmt == "parquet":
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("The parquet format requires pyarrow (pip install pyarrow)")
+    elif fmt != "csv":
+        raise ValueError(f"Unknown output format: {fmt} (expected csv or parquet)")
+
+    tmp_path = path + ".tmp"
+    writer = None
+    written = 0
+    try:
+        for chunk in iter_animal_chunks(n, chunk_size, seed, workers):
+            if fmt == "csv":
+                chunk.to_csv(tmp_path, mode="w" if written == 0 else "a", header=written == 0, index=False)
+            else:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(tmp_path, table.schema)
+                writer.write_table(table)
+            written += len(chunk)
+            print(f"  {written}/{n} rows written")
+        if written == 0:
+            # No chunk at all (n <= 0): still write a valid file with the header / schema
+            if fmt == "csv":
+                empty_catalog().to_csv(tmp_path, index=False)
+            else:
+                pq.write_table(pa.Table.from_pandas(empty_catalog(), preserve_index=False), tmp_path)
+    finally:
+        if writer is not None:
+            writer.close()
+    os.replace(tmp_path, path)
+    return written
+
 
 # Generate and save
 if __name__ == "__main__":
-    df = generate_animals(50)
-    df.to_csv("animals.csv", index=False)
-    print("✓ Generated 50 animals and saved to animals.csv")
-    print("\nSample of first 3 animals:")
-    print(df[["id", "name", "species", "breed", "energy_level", "friendliness_level"]].head(3).to_string(index=False))
-    print(f"\n✓ Total: {len(df)} animals with rich personality descriptions")
-    print("\nExample personality description:")
-    print(f"\n{df.iloc[0]['name']}: {df.iloc[0]['personality_description']}")
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Generate a synthetic animal catalog")
+    parser.add_argument("-n", "--n", type=int, default=50, help="Number of animals")
+    parser.add_argument("-o", "--output", default="animals.csv", help="Output file")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for reproducible output")
+    parser.add_argument("--chunk-size", type=int, default=10000, help="Rows per streamed chunk")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes (requires --seed)")
+    args = parser.parse_args()
+    if args.workers > 1 and args.seed is None:
+        parser.error("--workers requires --seed")
+
+    if args.seed is None and args.workers == 1 and args.format == "csv" and args.n <= args.chunk_size:
+        df = generate_animals(args.n)
+        df.to_csv(args.output, index=False)
+        print(f"✓ Generated {len(df)} animals and saved to {args.output}")
+        if df.empty:
+            raise SystemExit(0)
+        print("\nSample of first 3 animals:")
+        print(df[["id", "name", "species", "breed", "energy_level", "friendliness_level"]].head(3).to_string(index=False))
+        print(f"\n✓ Total: {len(df)} animals with rich personality descriptions")
+        print("\nExample personality description:")
+        print(f"\n{df.iloc[0]['name']}: {df.iloc[0]['personality_description']}")
+    else:
+        # Streaming always uses a seed: an unseeded run draws a random one, printed so the file can be reproduced
+        seed = random.randrange(2**32) if args.seed is None else args.seed
+        total = write_animals(args.output, args.n, args.format, args.chunk_size, seed, args.workers)
+        print(f"✓ Generated {total} animals (seed {seed}) and saved to {args.output}")
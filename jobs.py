@@ -0,0 +1,92 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+
+class JobQueue:
+    """
+    Exécution de tâches en arrière-plan sur un pool de threads, suivies par identifiant.
+
+    Le calcul NumPy / PyTorch relâche le GIL : des threads suffisent pour que les
+    requêtes web ne soient jamais bloquées par l'inférence. Les tâches terminées sont
+    oubliées `ttl` secondes après leur création. Une tâche soumise avec une `key` déjà
+    en cours (ex. le même questionnaire) réutilise la tâche existante.
+    """
+
+    def __init__(self, max_workers=2, ttl=600):
+        self.ttl = ttl
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='match-job')
+        self.jobs = {}
+        self.pending_keys = {}
+        self.lock = threading.RLock()
+
+    def _expire(self, now):
+        expired = [job_id for job_id, job in self.jobs.items()
+                   if job['future'].done() and now - job['created_at'] > self.ttl]
+        for job_id in expired:
+            del self.jobs[job_id]
+
+    def submit(self, fn, *args, key=None):
+        """Soumet fn(*args) et retourne l'identifiant de la tâche."""
+        with self.lock:
+            now = time.monotonic()
+            self._expire(now)
+            if key is not None:
+                job_id = self.pending_keys.get(key)
+                if job_id in self.jobs and not self.jobs[job_id]['future'].done():
+                    return job_id
+
+            job_id = uuid.uuid4().hex
+            job = {'created_at': now, 'started_at': None, 'finished_at': None, 'key': key}
+
+            def run():
+                job['started_at'] = time.monotonic()
+                try:
+                    return fn(*args)
+                finally:
+                    job['finished_at'] = time.monotonic()
+
+            job['future'] = self.executor.submit(run)
+            self.jobs[job_id] = job
+            if key is not None:
+                self.pending_keys[key] = job_id
+                job['future'].add_done_callback(lambda _: self._forget_key(key, job_id))
+            return job_id
+
+    def _forget_key(self, key, job_id):
+        with self.lock:
+            if self.pending_keys.get(key) == job_id:
+                del self.pending_keys[key]
+
+    def status(self, job_id):
+        """
+        État d'une tâche : {'status': 'queued' | 'running' | 'done' | 'error' | 'unknown', ...}.
+
+        'unknown' désigne une tâche expirée ou soumise à un autre processus.
+        """
+        with self.lock:
+            job = self.jobs.get(job_id)
+        if job is None:
+            return {'status': 'unknown'}
+
+        future = job['future']
+        if not future.done():
+            state = 'running' if job['started_at'] is not None else 'queued'
+            return {'status': state, 'age_s': round(time.monotonic() - job['created_at'], 3)}
+
+        error = future.exception()
+        if error is not None:
+            return {'status': 'error', 'error': str(error)}
+        return {'status': 'done', 'duration_s': round(job['finished_at'] - job['created_at'], 3)}
+
+    def result(self, job_id):
+        """Résultat d'une tâche terminée avec succès, ou None."""
+        with self.lock:
+            job = self.jobs.get(job_id)
+        if job is None or not job['future'].done() or job['future'].exception() is not None:
+            return None
+        return job['future'].result()
+
+    def shutdown(self, wait=False):
+        self.executor.shutdown(wait=wait)
@@ -1,65 +1,354 @@
 import pandas as pd
 import numpy as np
-from sklearn.neighbors import NearestNeighbors
-from sentence_transformers import SentenceTransformer
 import warnings
+import hashlib
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from collections import namedtuple
+from catalog_bundle import is_bundle, read_bundle, sort_by_species
+from embedding_cache import EmbeddingCache
+from encoders import HashingEncoder, create_encoder, encoder_cache_name
+import metrics
+from profile_cache import ProfileVectorCache
+from record_store import RecordStore
+from scoring import AttributeIndex, HybridScorer
+from search import build_index, normalize_rows, rerank
+from shared_index import is_shared, read_shared
+from similarity_graph import SimilarityGraph
 
-# Supprimer l'avertissement de FutureWarning de scikit-learn
+# Supprimer les avertissements FutureWarning (pandas / transformers)
 warnings.filterwarnings("ignore", category=FutureWarning)
 
+# Clé de l'index couvrant tout le catalogue (aucun filtre d'espèce)
+NO_PREFERENCE = 'no preference'
+
+# État du catalogue lu d'un seul coup par les requêtes (voir AnimalMatcher._snapshot)
+CatalogState = namedtuple('CatalogState', ['df', 'vectors', 'indexes', 'records', 'attributes', 'similar'])
+
 # --- Configuration du Modèle NLP ---
-# Charger le modèle NLP une seule fois au démarrage
-try:
-    print("Chargement du modèle SentenceTransformer (all-MiniLM-L6-v2)...")
-    # Utiliser un modèle léger et rapide pour l'encodage
-    NLP_MODEL = SentenceTransformer('all-MiniLM-L6-v2')
-    VECTOR_DIMENSION = 384
-    print("Modèle NLP chargé.")
-except Exception as e:
-    print(f"Erreur lors du chargement de SentenceTransformer : {e}")
-    NLP_MODEL = None
-    VECTOR_DIMENSION = 384 # Dimension par défaut si le modèle échoue
+# Le modèle est chargé au premier besoin (voir get_model) et non à l'import,
+# pour que les pages qui n'en ont pas besoin soient servies immédiatement.
+MODEL_NAME = 'all-MiniLM-L6-v2'
+VECTOR_DIMENSION = 384 # Dimension des embeddings de all-MiniLM-L6-v2
+
+# Moteur d'encodage ('transformer', 'quantized' ou 'hashing', voir encoders.py et configure_encoder)
+_ENCODER_BACKEND = 'transformer'
+_ENCODER_THREADS = None
+_NLP_MODEL = None
+_MODEL_LOADED = False
+_MODEL_LOCK = threading.Lock()
+# Encodeur de secours (n-grammes hachés) si le moteur configuré n'a pas pu être chargé
+_FALLBACK_ENCODER = None
+# Durée du chargement du modèle (en secondes), None tant qu'il n'a pas été chargé
+MODEL_LOAD_SECONDS = None
+# Service d'encodage par micro-lots utilisé par get_vector (voir encoder_service.py), None = appel direct
+_ENCODER_SERVICE = None
+
+
+def configure_encoder(backend='transformer', num_threads=None):
+    """
+    Choisit le moteur d'encodage, chargé au prochain get_model().
+
+    `num_threads` limite les threads de PyTorch (moteurs 'transformer' et 'quantized').
+    """
+    global _ENCODER_BACKEND, _ENCODER_THREADS, _NLP_MODEL, _MODEL_LOADED, MODEL_LOAD_SECONDS
+    encoder_cache_name(backend, MODEL_NAME, VECTOR_DIMENSION)  # valide le nom du moteur
+    with _MODEL_LOCK:
+        _ENCODER_BACKEND = backend
+        _ENCODER_THREADS = num_threads
+        _NLP_MODEL = None
+        _MODEL_LOADED = False
+        MODEL_LOAD_SECONDS = None
+
+
+def encoder_name():
+    """
+    Nom de l'encodeur effectif, clé des caches d'embeddings (connu sans charger le modèle) :
+    celui de l'encodeur de secours si le chargement du modèle a échoué (voir get_encoder).
+    """
+    if _MODEL_LOADED:
+        if _NLP_MODEL is None:
+            return HashingEncoder.cache_name(None, VECTOR_DIMENSION)
+        if hasattr(_NLP_MODEL, 'name'):
+            return _NLP_MODEL.name
+    return encoder_cache_name(_ENCODER_BACKEND, MODEL_NAME, VECTOR_DIMENSION)
+
+
+def get_model():
+    """Retourne l'encodeur configuré, chargé une seule fois au premier appel (None si le chargement a échoué)."""
+    global _NLP_MODEL, _MODEL_LOADED, MODEL_LOAD_SECONDS
+    if not _MODEL_LOADED:
+        with _MODEL_LOCK:
+            if not _MODEL_LOADED:
+                started = time.perf_counter()
+                try:
+                    print(f"Chargement de l'encodeur '{_ENCODER_BACKEND}' ({MODEL_NAME})...")
+                    _NLP_MODEL = create_encoder(_ENCODER_BACKEND, MODEL_NAME, VECTOR_DIMENSION, _ENCODER_THREADS)
+                    print("Modèle NLP chargé.")
+                except Exception as e:
+                    print(f"Erreur lors du chargement de l'encodeur '{_ENCODER_BACKEND}' : {e}")
+                    _NLP_MODEL = None
+                MODEL_LOAD_SECONDS = time.perf_counter() - started
+                _MODEL_LOADED = True
+    return _NLP_MODEL
+
+
+def get_encoder():
+    """
+    Encodeur à utiliser : le modèle configuré, ou à défaut l'encodeur déterministe par n-grammes
+    hachés (au lieu de vecteurs aléatoires). Les vecteurs de secours ne sont jamais mis en cache.
+    """
+    global _FALLBACK_ENCODER
+    model = get_model()
+    if model is not None:
+        return model
+    if _FALLBACK_ENCODER is None:
+        print("⚠️ AVERTISSEMENT : Encodeur indisponible, repli sur l'encodeur par n-grammes hachés "
+              "(matching dégradé).")
+        _FALLBACK_ENCODER = HashingEncoder(VECTOR_DIMENSION)
+    return _FALLBACK_ENCODER
+
+
+def _count_fallback(n):
+    if get_model() is None:
+        metrics.FALLBACK_VECTORS_TOTAL.inc(n)
+
+
+def set_model(model):
+    """
+    Remplace le modèle NLP (ex. encodeur déterministe pour les benchmarks hors ligne).
+    Le modèle doit exposer `encode(textes, batch_size=..., show_progress_bar=...)`.
+    """
+    global _NLP_MODEL, _MODEL_LOADED, MODEL_LOAD_SECONDS
+    with _MODEL_LOCK:
+        _NLP_MODEL = model
+        _MODEL_LOADED = True
+        MODEL_LOAD_SECONDS = 0.0
+
+
+def set_encoder_service(service):
+    """
+    Fait passer get_vector par un service d'encodage par micro-lots (ex. BatchingEncoder(encode_texts)),
+    ou revient à l'appel direct du modèle avec None.
+    """
+    global _ENCODER_SERVICE
+    _ENCODER_SERVICE = service
+
+
+def encode_texts(texts):
+    """Encode un lot de textes en une seule passe de l'encodeur."""
+    texts = list(texts)
+    _count_fallback(len(texts))
+    return get_encoder().encode(texts, batch_size=max(len(texts), 1), show_progress_bar=False)
+
 
 def get_vector(text):
     """Convertit un texte en un vecteur d'embedding."""
-    if NLP_MODEL:
-        # Encoder le texte en utilisant le modèle chargé
-        return NLP_MODEL.encode(text)
+    if _ENCODER_SERVICE is not None:
+        # Les requêtes concurrentes partagent une même passe du modèle
+        return _ENCODER_SERVICE.encode(text)
+    _count_fallback(1)
+    return get_encoder().encode(text)
+
+
+def _init_encode_worker(n_workers, backend):
+    """Charge le même moteur d'encodage et limite les threads du modèle dans chaque processus du pool."""
+    configure_encoder(backend, num_threads=max(1, (os.cpu_count() or 1) // n_workers))
+
+
+def _encode_chunk(args):
+    """Encode un lot de textes (dans le processus courant ou un processus du pool)."""
+    start, texts, batch_size = args
+    return start, get_encoder().encode(texts, batch_size=batch_size, show_progress_bar=False)
+
+
+def encode_batch(texts, batch_size=64, n_workers=0, show_progress=True):
+    """
+    Encode une liste de textes par lots dans un tableau préalloué (n, VECTOR_DIMENSION).
+
+    Avec `n_workers` > 1, les lots sont répartis sur un pool de processus (un modèle par
+    processus). Le pool utilise `spawn` : l'appelant doit être protégé par
+    `if __name__ == '__main__'` (voir precompute.py).
+    """
+    texts = list(texts)
+    vectors = np.empty((len(texts), VECTOR_DIMENSION), dtype=np.float32)
+    if not texts:
+        return vectors
+
+    _count_fallback(len(texts))
+    if get_model() is None:
+        # Pas de pool de processus pour l'encodeur de secours, très rapide
+        n_workers = 0
+
+    total = len(texts)
+    # Les processus reçoivent des blocs plus gros pour amortir la sérialisation
+    chunk_size = batch_size * 8 if n_workers > 1 else batch_size
+    chunks = [(i, texts[i:i + chunk_size], batch_size) for i in range(0, total, chunk_size)]
+
+    started = time.perf_counter()
+    last_report = started
+    done = 0
+
+    def record(start, chunk_vectors):
+        nonlocal done, last_report
+        vectors[start:start + len(chunk_vectors)] = chunk_vectors
+        done += len(chunk_vectors)
+        now = time.perf_counter()
+        if show_progress and (now - last_report >= 2 or done == total):
+            last_report = now
+            rate = done / max(now - started, 1e-9)
+            print(f"  {done}/{total} descriptions encodées ({rate:.0f} desc/s)")
+
+    if n_workers > 1:
+        ctx = multiprocessing.get_context('spawn')
+        with ctx.Pool(n_workers, initializer=_init_encode_worker, initargs=(n_workers, _ENCODER_BACKEND)) as pool:
+            for start, chunk_vectors in pool.imap_unordered(_encode_chunk, chunks):
+                record(start, chunk_vectors)
     else:
-        # Retourne un vecteur aléatoire si le modèle n'a pas pu charger (pour les tests uniquement)
-        print("ATTENTION: Utilisation d'un vecteur aléatoire (NLP non chargé).")
-        return np.random.rand(VECTOR_DIMENSION)
+        for chunk in chunks:
+            record(*_encode_chunk(chunk))
+
+    elapsed = time.perf_counter() - started
+    print(f"✓ {total} textes encodés en {elapsed:.1f}s ({total / max(elapsed, 1e-9):.0f} desc/s).")
+    return vectors
+
 
 class AnimalMatcher:
-    def __init__(self, csv_path="data/animals.csv", n_neighbors=5):
-        """Initialise le matcher d'animaux avec KNN."""
-        self.df = pd.read_csv(csv_path)
-        self.df.columns = self.df.columns.str.lower()
+    def __init__(self, csv_path="data/animals.csv", n_neighbors=5, cache_dir="data/cache",
+                 batch_size=64, n_workers=0, index_backend='exact', index_params=None,
+                 scoring='semantic', hybrid_weights=None, n_similar=0):
+        """
+        Initialise le matcher d'animaux avec KNN.
+
+        `csv_path` est un catalogue CSV, un bundle binaire (dossier écrit par catalog_bundle.py)
+        ou un catalogue publié en mémoire partagée ('shm://<préfixe>', voir shared_index.py) :
+        les embeddings du bundle ou de la mémoire partagée sont repris tels quels par prepare_embeddings.
+
+        `cache_dir` est le dossier du cache disque des embeddings (None pour le désactiver).
+        `batch_size` et `n_workers` contrôlent l'encodage du catalogue (voir encode_batch).
+        `index_backend` choisit le moteur de recherche ('exact', 'ivf' ou 'quantized', voir search.py) et
+        `index_params` ses paramètres (ex. {'n_lists': 1024, 'nprobe': 16}).
+        `scoring` vaut 'semantic' (similarité cosinus seule) ou 'hybrid' (cosinus combiné aux
+        colonnes énergie / sociabilité / âge, voir scoring.py) avec les poids `hybrid_weights`.
+        `n_similar` est le nombre d'animaux similaires pré-calculés par animal (0 pour désactiver,
+        voir similarity_graph.py et similar_animals).
+        """
+        self.csv_path = csv_path
+        # vectors_encoder : nom de l'encodeur qui a produit les embeddings du catalogue (voir _align_encoder)
+        df, self._bundle_vectors, self.vectors_encoder = self._read_catalog(csv_path)
+        self.df = self._prepare_columns(df)
         self.n_neighbors = n_neighbors
-        self.knn_model = None
+        self.cache_dir = cache_dir
+        self._embeddings = None
+        self.batch_size = batch_size
+        self.n_workers = n_workers
+        self.index_backend = index_backend
+        self.index_params = index_params or {}
+        if scoring not in ('semantic', 'hybrid'):
+            raise ValueError(f"Mode de score inconnu : '{scoring}' (choix : semantic, hybrid).")
+        self.scoring = scoring
+        self.scorer = HybridScorer(hybrid_weights)
+        self.n_similar = n_similar
+        self.profile_cache = ProfileVectorCache(cache_dir, encoder_name(), VECTOR_DIMENSION)
+        # Embeddings des fragments de profil (une phrase par réponse), pour le matching progressif
+        self.fragment_vectors = {}
+        self._fragment_lock = threading.Lock()
+        self.indexes = None
         self.animal_vectors = None
+        # Vrai quand animal_vectors vient d'un bundle (déjà normalisé, index construits sans copie)
+        self._vectors_normalized = False
+        # Fichier memory-mappé des embeddings du catalogue (moteur 'quantized', voir _map_vectors)
+        self._vectors_file = None
+        # Fiches d'affichage indexées par id, index d'attributs et graphe des animaux similaires
+        # (construits avec les index)
+        self.records = None
+        self.attributes = None
+        self.similar = None
+        # Incrémentée à chaque modification du catalogue
+        self.catalog_version = 0
+        # _state_lock protège la lecture/l'échange du catalogue, _update_lock sérialise les mises à jour
+        self._state_lock = threading.Lock()
+        self._update_lock = threading.Lock()
+
+    @staticmethod
+    def _read_catalog(path):
+        """
+        Lit un catalogue CSV, un bundle binaire ou un catalogue en mémoire partagée.
+
+        Returns:
+            (df, vectors, encoder) : vectors est None pour un CSV ou un bundle d'un autre encodeur,
+            encoder est le nom de l'encodeur qui a produit vectors.
+        """
+        name = encoder_name()
+        if is_shared(path):
+            return (*read_shared(path, name, VECTOR_DIMENSION), name)
+        if is_bundle(path):
+            return (*read_bundle(path, name, VECTOR_DIMENSION), name)
+        return pd.read_csv(path), None, None
+
+    @staticmethod
+    def _prepare_columns(df):
+        """Normalise les colonnes d'un catalogue lu depuis le CSV."""
+        df.columns = df.columns.str.lower()
 
         NOM_COLONNE_IMAGE_DANS_CSV = 'image_url' # <--- MODIFIEZ CECI !
         NOM_COLONNE_DESCRIPTION_DANS_CSV = 'personality_description' # Déjà utilisé
 
-        if NOM_COLONNE_IMAGE_DANS_CSV in self.df.columns:
+        if NOM_COLONNE_IMAGE_DANS_CSV in df.columns:
             # Renomme la colonne de l'image en 'img_url' pour correspondre au HTML
-            self.df = self.df.rename(columns={NOM_COLONNE_IMAGE_DANS_CSV: 'img_url'})
+            df = df.rename(columns={NOM_COLONNE_IMAGE_DANS_CSV: 'img_url'})
             print(f"La colonne '{NOM_COLONNE_IMAGE_DANS_CSV}' a été renommée en 'img_url'.")
-        else:
+        elif 'img_url' not in df.columns:
              print(f"⚠️ AVERTISSEMENT : La colonne '{NOM_COLONNE_IMAGE_DANS_CSV}' est introuvable. Les images ne s'afficheront pas.")
         
         # Vérification de la colonne de description avant l'utilisation
-        if NOM_COLONNE_DESCRIPTION_DANS_CSV not in self.df.columns:
+        if NOM_COLONNE_DESCRIPTION_DANS_CSV not in df.columns:
              raise ValueError(f"Colonne essentielle '{NOM_COLONNE_DESCRIPTION_DANS_CSV}' manquante pour le matching.")
-        
-        
+        return df
+
+    def _embedding_cache(self):
+        """Cache disque des embeddings de l'encodeur courant, ouvert une fois et réutilisé par les mises à jour."""
+        name = encoder_name()
+        if self._embeddings is None or self._embeddings.model_name != name:
+            self._embeddings = EmbeddingCache(self.cache_dir, name, VECTOR_DIMENSION)
+        return self._embeddings
+
+    def _embed(self, descriptions, prune=False):
+        """
+        Encode des descriptions en passant par le cache disque si disponible.
+        `prune` indique que `descriptions` est le catalogue complet (voir EmbeddingCache.get_many).
+        """
+        def encode(texts):
+            return encode_batch(texts, batch_size=self.batch_size, n_workers=self.n_workers)
+
+        if self.cache_dir:
+            # Seules les descriptions nouvelles ou modifiées passent par le modèle,
+            # qui n'est chargé que si le cache ne couvre pas tout le catalogue
+            cache = self._embedding_cache()
+            if cache.covers(descriptions) or get_model():
+                return cache.get_many(descriptions, encode, prune=prune)
+        # Pas de cache pour les vecteurs de l'encodeur de secours
+        return encode(descriptions)
+
     def prepare_embeddings(self):
         """Convertit toutes les descriptions de personnalité des animaux en vecteurs."""
+        if self._bundle_vectors is not None:
+            # Embeddings du bundle (memory-map) ou de la mémoire partagée : aucune lecture ni encodage au démarrage
+            self.animal_vectors, self._bundle_vectors = self._bundle_vectors, None
+            self._vectors_normalized = True
+            source = "la mémoire partagée" if is_shared(self.csv_path) else "le bundle"
+            print(f"✓ Les {len(self.animal_vectors)} embeddings ont été chargés depuis {source}.")
+            return
         print("Conversion des descriptions en embeddings...")
-        self.animal_vectors = np.array([
-            get_vector(desc) for desc in self.df['personality_description']
-        ])
+        vectors = self._embed(self.df['personality_description'].tolist(), prune=True)
+        # Une seule matrice, normalisée et triée par espèce : tous les index en sont des vues
+        self.df, self.animal_vectors = sort_by_species(self.df, vectors)
+        self.animal_vectors = self._map_vectors(self.animal_vectors)
+        self._vectors_normalized = True
+        self.vectors_encoder = encoder_name()
         print(f"✓ Création des embeddings pour {len(self.animal_vectors)} animaux terminée.")
         
     def train_knn(self):
@@ -68,19 +357,374 @@ class AnimalMatcher:
             self.prepare_embeddings()
             
         print("Entraînement du modèle KNN...")
-        self.knn_model = NearestNeighbors(
-            n_neighbors=self.n_neighbors,
-            metric='cosine',  # La métrique Cosine est excellente pour les embeddings de texte
-            algorithm='brute'
-        )
-        self.knn_model.fit(self.animal_vectors)
-        print("✓ Modèle KNN entraîné.")
-        
+        self.indexes, self.records, self.attributes, self.similar = self._build_state(
+            self.df, self.animal_vectors, self._vectors_normalized)
+        print(f"✓ Modèle KNN entraîné (moteur '{self.index_backend}', {len(self.indexes) - 1} filtres d'espèce).")
+
+    def _build_state(self, df, animal_vectors, normalized=False):
+        """
+        Index de recherche, fiches, index d'attributs et graphe des animaux similaires d'un catalogue :
+        (indexes, records, attributes, similar).
+        """
+        indexes = self._build_indexes(df, animal_vectors, normalized)
+        return indexes, RecordStore(df), AttributeIndex(df), self._build_similar(df, animal_vectors)
+
+    def _build_indexes(self, df, animal_vectors, normalized=False, full=None):
+        """
+        Un index par filtre d'espèce, plus un pour "pas de préférence", construits une seule
+        fois au lieu d'un KNN temporaire par requête.
+
+        `full` est l'index "pas de préférence" s'il est déjà construit (ex. patché par _apply_changes).
+        """
+        species = df['species'].str.lower().to_numpy()
+        if full is None:
+            full = self._build_index(animal_vectors, np.arange(len(df)), normalized)
+        indexes = {NO_PREFERENCE: full}
+        for name in np.unique(species):
+            rows = np.flatnonzero(species == name)
+            if len(rows) and rows[-1] - rows[0] + 1 == len(rows):
+                if hasattr(full, 'sliced'):
+                    # Index compact : tranche des codes de l'index complet, sans nouvelle quantification
+                    indexes[name] = full.sliced(rows[0], rows[-1] + 1)
+                    continue
+                # Lignes contiguës (catalogue trié par espèce) : une vue au lieu d'une copie
+                vectors = animal_vectors[rows[0]:rows[-1] + 1]
+            else:
+                vectors = animal_vectors[rows]
+            indexes[name] = self._build_index(vectors, rows, normalized)
+        return indexes
+
+    def _map_vectors(self, vectors):
+        """
+        Embeddings normalisés du catalogue en memory-map, pour le moteur 'quantized'.
+
+        Ce moteur ne lit la matrice float32 que pour re-scorer quelques candidats : elle est écrite
+        dans le dossier de cache et laissée au cache de pages du système (partagé entre workers)
+        au lieu d'une copie en mémoire par processus. Les embeddings déjà en lecture seule
+        (bundle, mémoire partagée) sont repris tels quels.
+        """
+        if self.index_backend != 'quantized' or not self.cache_dir or not vectors.flags.writeable:
+            return vectors
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        # Nom dérivé du contenu : les workers d'un même catalogue partagent le même fichier
+        path = os.path.join(self.cache_dir, f"catalog_vectors_{hashlib.sha1(vectors).hexdigest()[:20]}.npy")
+        os.makedirs(self.cache_dir, exist_ok=True)
+        for _ in range(3):
+            if not os.path.exists(path):
+                tmp = f"{path}.{uuid.uuid4().hex}.tmp.npy"
+                np.save(tmp, vectors)
+                os.replace(tmp, path)
+            try:
+                mapped = np.load(path, mmap_mode='r')
+                break
+            except FileNotFoundError:
+                # Supprimé entre-temps par un autre processus (version précédente du catalogue)
+                continue
+        else:
+            return vectors
+
+        # Le fichier de la version précédente n'est plus référencé que par les memory-maps ouverts
+        previous, self._vectors_file = self._vectors_file, path
+        if previous and previous != path:
+            try:
+                os.remove(previous)
+            except OSError:
+                pass
+        return mapped
+
+    def _build_similar(self, df, animal_vectors):
+        """Graphe des animaux similaires (None si n_similar vaut 0)."""
+        if not self.n_similar:
+            return None
+        started = time.perf_counter()
+        graph = SimilarityGraph(animal_vectors, df['species'].str.lower().to_numpy(), self.n_similar)
+        print(f"✓ Graphe des animaux similaires calculé ({len(graph)} animaux, "
+              f"{time.perf_counter() - started:.2f}s).")
+        return graph
+
+    def replace_catalog(self, df, animal_vectors, normalized=False, encoder=None):
+        """
+        Remplace tout le catalogue et ses embeddings (ex. nouvelle version en mémoire partagée).
+
+        Les index sont reconstruits à part puis échangés d'un seul coup, comme dans _apply_changes.
+        Avec `normalized=True`, les embeddings sont déjà normalisés et triés par espèce (bundle,
+        mémoire partagée) et utilisés sans copie; sinon ils sont normalisés et triés ici.
+        `encoder` est le nom de l'encodeur des embeddings (l'encodeur effectif par défaut).
+        """
+        df = self._prepare_columns(df)
+        if not normalized:
+            df, animal_vectors = sort_by_species(df, animal_vectors)
+        with self._update_lock:
+            self._install_catalog(df, animal_vectors, encoder or encoder_name())
+
+    def _install_catalog(self, df, animal_vectors, encoder):
+        """Construit l'état d'un catalogue normalisé et trié par espèce, puis l'échange (sous _update_lock)."""
+        animal_vectors = self._map_vectors(animal_vectors)
+        indexes = self._build_indexes(df, animal_vectors, normalized=True)
+        similar = self._replacement_similar(df, animal_vectors, encoder)
+        records, attributes = RecordStore(df), AttributeIndex(df)
+        with self._state_lock:
+            self.df = df
+            self.animal_vectors = animal_vectors
+            self._vectors_normalized = True
+            self.vectors_encoder = encoder
+            self.indexes = indexes
+            self.records = records
+            self.attributes = attributes
+            self.similar = similar
+            self.catalog_version += 1
+
+    def _replacement_similar(self, df, animal_vectors, encoder):
+        """
+        Graphe des animaux similaires d'un catalogue de remplacement, patché depuis le graphe courant :
+        les animaux dont l'espèce et la description n'ont pas changé gardent leurs voisins, seuls les
+        autres (et ceux qui ont perdu un voisin) sont recalculés, comme dans _apply_changes.
+        Recalculé en entier si les embeddings viennent d'un autre encodeur.
+        """
+        state = self._snapshot()
+        if state.similar is None or encoder != self.vectors_encoder:
+            return self._build_similar(df, animal_vectors)
+
+        started = time.perf_counter()
+        columns = ['id', 'species', 'personality_description']
+        new_rows = {tuple(key): row for row, key in enumerate(df[columns].to_numpy().tolist())}
+        # Ligne du nouveau catalogue de chaque ancienne ligne (-1 si l'animal a disparu ou changé)
+        old_keys = state.df[columns].to_numpy().tolist()
+        new_row_of_old = np.array([new_rows.get(tuple(key), -1) for key in old_keys], dtype=np.int64)
+        keep = new_row_of_old >= 0
+        kept = new_row_of_old[keep]
+        added = np.setdiff1d(np.arange(len(df)), kept)
+
+        # Catalogue intermédiaire attendu par SimilarityGraph.patched (lignes conservées puis ajoutées),
+        # remis ensuite dans l'ordre du nouveau catalogue
+        merged = np.concatenate([kept, added])
+        species = df['species'].str.lower().to_numpy()
+        graph = state.similar.patched(keep, animal_vectors[merged], species[merged],
+                                      np.arange(len(kept), len(merged)))
+        order = np.empty(len(merged), dtype=np.int64)
+        order[merged] = np.arange(len(merged))
+        graph = graph.permuted(order)
+        print(f"✓ Graphe des animaux similaires mis à jour ({len(added)} animaux nouveaux ou modifiés, "
+              f"{int((~keep).sum())} retirés ou modifiés, {time.perf_counter() - started:.2f}s).")
+        return graph
+
+    def _align_encoder(self):
+        """
+        Ré-encode le catalogue si ses embeddings ne viennent pas de l'encodeur effectif.
+
+        Quand le modèle n'a pas pu être chargé, les profils sont encodés par l'encodeur de secours,
+        dont les vecteurs ne sont pas comparables à ceux du modèle (cache, bundle, mémoire partagée) :
+        le catalogue est alors ré-encodé une fois avec l'encodeur de secours.
+        """
+        if self.vectors_encoder == encoder_name():
+            return
+        with self._update_lock:
+            name = encoder_name()
+            if self.vectors_encoder == name:
+                return
+            print(f"⚠️ AVERTISSEMENT : Embeddings du catalogue ('{self.vectors_encoder}') incompatibles avec "
+                  f"l'encodeur '{name}', ré-encodage du catalogue.")
+            df = self._snapshot().df
+            # Le catalogue est déjà trié par espèce : seuls les embeddings changent
+            vectors = normalize_rows(self._embed(df['personality_description'].tolist()))
+            self._install_catalog(df, vectors, name)
+
+    def _build_index(self, vectors, rows, normalized=False):
+        """Construit un index de recherche avec le moteur configuré."""
+        return build_index(self.index_backend, vectors, rows, normalized=normalized, **self.index_params)
+
+    def _snapshot(self):
+        """État du catalogue (CatalogState) cohérent, lu sans bloquer les mises à jour."""
+        with self._state_lock:
+            return CatalogState(self.df, self.animal_vectors, self.indexes, self.records, self.attributes,
+                                self.similar)
+
+    def _apply_changes(self, remove_ids=(), new_rows=None, new_vectors=None):
+        """
+        Supprime `remove_ids` puis ajoute `new_rows` (avec leurs embeddings) au catalogue.
+
+        Les index sont patchés sur une copie, puis le nouvel état est échangé d'un seul coup :
+        les requêtes en cours continuent sur l'ancien état.
+        """
+        if self.indexes is None:
+            self.train_knn()
+
+        with self._update_lock:
+            df, vectors, indexes, records, _, similar = self._snapshot()
+            if new_rows is None:
+                new_rows = df.iloc[:0]
+                new_vectors = vectors[:0]
+
+            keep = ~df['id'].isin(list(remove_ids)).to_numpy()
+            n_kept = int(keep.sum())
+            new_vectors = normalize_rows(new_vectors) if len(new_rows) else vectors[:0]
+
+            # Lignes conservées puis ajoutées, re-triées par espèce pour que chaque espèce
+            # reste une tranche contiguë de l'unique matrice d'embeddings normalisés
+            merged_df = pd.concat([df[keep], new_rows], ignore_index=True)
+            merged_vectors = np.concatenate([vectors[keep], new_vectors])
+            merged_species = merged_df['species'].str.lower().to_numpy()
+            order = np.argsort(merged_species, kind='stable')
+            position = np.empty(len(order), dtype=np.int64)
+            position[order] = np.arange(len(order))
+            new_df = merged_df.iloc[order].reset_index(drop=True)
+            all_vectors = merged_vectors[order]
+
+            all_vectors = self._map_vectors(all_vectors)
+            if self.index_backend == 'exact':
+                # Les index exacts ne sont que des vues : reconstruits sans calcul
+                new_indexes = self._build_indexes(new_df, all_vectors, normalized=True)
+            elif hasattr(indexes[NO_PREFERENCE], 'sliced'):
+                # Index compact : seul l'index complet est patché, les index d'espèce en sont des tranches
+                remap = np.full(len(df), -1, dtype=np.int64)
+                remap[keep] = position[:n_kept]
+                full = indexes[NO_PREFERENCE].patched(remap, new_vectors, position[n_kept:])
+                new_indexes = self._build_indexes(new_df, all_vectors, normalized=True, full=full)
+            else:
+                # Les index compacts / IVF ont leur propre représentation : patchés
+                remap = np.full(len(df), -1, dtype=np.int64)
+                remap[keep] = position[:n_kept]
+                added_rows = position[n_kept:]
+                added_species = merged_species[n_kept:]
+                new_indexes = {NO_PREFERENCE: indexes[NO_PREFERENCE].patched(remap, new_vectors, added_rows)}
+                for name in set(indexes) | set(added_species):
+                    if name == NO_PREFERENCE:
+                        continue
+                    mask = added_species == name
+                    if name in indexes:
+                        new_indexes[name] = indexes[name].patched(remap, new_vectors[mask], added_rows[mask])
+                    else:
+                        new_indexes[name] = self._build_index(new_vectors[mask], added_rows[mask], normalized=True)
+
+            new_records = records.patched(keep, new_rows, order)
+            new_attributes = AttributeIndex(new_df)
+            new_similar = None
+            if similar is not None:
+                # Seuls les animaux ajoutés et ceux qui ont perdu un voisin sont recalculés
+                new_similar = similar.patched(keep, merged_vectors, merged_species,
+                                              np.arange(n_kept, len(merged_df))).permuted(order)
+
+            with self._state_lock:
+                self.df = new_df
+                self.records = new_records
+                self.attributes = new_attributes
+                self.similar = new_similar
+                self.animal_vectors = all_vectors
+                self._vectors_normalized = True
+                self.indexes = new_indexes
+                self.catalog_version += 1
+
+    def _vectors_for(self, new_rows):
+        """
+        Embeddings des lignes données : ceux du catalogue courant sont réutilisés quand la
+        description n'a pas changé, seules les autres sont encodées.
+        """
+        state = self._snapshot()
+        df, vectors = state.df, state.vectors
+        positions = dict(zip(zip(df['id'], df['personality_description']), range(len(df))))
+
+        new_vectors = np.empty((len(new_rows), VECTOR_DIMENSION), dtype=np.float32)
+        changed = []
+        for i, key in enumerate(zip(new_rows['id'], new_rows['personality_description'])):
+            if key in positions:
+                new_vectors[i] = vectors[positions[key]]
+            else:
+                changed.append(i)
+        if changed:
+            new_vectors[changed] = self._embed(new_rows['personality_description'].iloc[changed].tolist())
+        return new_vectors, len(changed)
+
+    def upsert_animals(self, records, remove_ids=()):
+        """
+        Ajoute ou remplace (par 'id') des animaux et retire `remove_ids`, en une seule mise à jour.
+
+        Returns:
+            Nombre de descriptions ré-encodées.
+        """
+        if self.indexes is None:
+            self.train_knn()
+        new_rows = self._prepare_columns(pd.DataFrame(records)).reset_index(drop=True)
+        new_vectors, n_encoded = self._vectors_for(new_rows)
+        if self.vectors_encoder != encoder_name():
+            # Repli sur l'encodeur de secours pendant l'encodage : le catalogue est ré-encodé d'abord
+            self._align_encoder()
+            new_vectors, n_encoded = self._vectors_for(new_rows)
+        self._apply_changes(list(remove_ids) + new_rows['id'].tolist(), new_rows, new_vectors)
+        return n_encoded
+
+    def add_animals(self, records):
+        """Ajoute de nouveaux animaux (liste de dictionnaires ou DataFrame) au catalogue."""
+        new_ids = set(pd.DataFrame(records)['id'])
+        existing = new_ids & set(self.df['id'])
+        if existing:
+            raise ValueError(f"Animaux déjà présents dans le catalogue : {sorted(existing)}")
+        self.upsert_animals(records)
+        print(f"✓ {len(new_ids)} animaux ajoutés au catalogue.")
+
+    def update_animals(self, records):
+        """Met à jour des animaux existants (par 'id'); seules les descriptions modifiées sont ré-encodées."""
+        ids = set(pd.DataFrame(records)['id'])
+        unknown = ids - set(self.df['id'])
+        if unknown:
+            raise KeyError(f"Animaux introuvables dans le catalogue : {sorted(unknown)}")
+        n_encoded = self.upsert_animals(records)
+        print(f"✓ {len(ids)} animaux mis à jour ({n_encoded} descriptions ré-encodées).")
+
+    def remove_animals(self, ids):
+        """Retire des animaux du catalogue (adoptés par exemple)."""
+        self._apply_changes(ids)
+        print(f"✓ {len(ids)} animaux retirés du catalogue.")
+
+    def reload_csv(self, csv_path=None):
+        """
+        Relit le CSV (ou le bundle) et applique uniquement la différence avec le catalogue courant.
+        Un catalogue en mémoire partagée est repris en entier (embeddings déjà calculés par le chargeur).
+
+        Returns:
+            Dictionnaire {'added', 'updated', 'removed', 'version'}.
+        """
+        path = csv_path or self.csv_path
+        new_df, new_vectors, encoder = self._read_catalog(path)
+        new_df = self._prepare_columns(new_df)
+        df = self._snapshot().df
+
+        old_ids = set(df['id'])
+        removed = sorted(old_ids - set(new_df['id']))
+
+        # Comparaison ligne à ligne des animaux présents dans les deux versions
+        common = new_df[new_df['id'].isin(old_ids)].set_index('id')
+        previous = df.set_index('id').reindex(index=common.index, columns=common.columns)
+        differs = ~((common == previous) | (common.isna() & previous.isna())).all(axis=1)
+        updated = new_df[new_df['id'].isin(common.index[differs.to_numpy()])]
+        added = new_df[~new_df['id'].isin(old_ids)]
+
+        if is_shared(path):
+            if new_vectors is None:
+                # Publié par un autre encodeur : descriptions ré-encodées dans ce processus
+                self.replace_catalog(new_df, self._embed(new_df['personality_description'].tolist()))
+            else:
+                self.replace_catalog(new_df, new_vectors, normalized=True, encoder=encoder)
+        elif len(updated) or len(added) or removed:
+            self.upsert_animals(pd.concat([updated, added]), remove_ids=removed)
+
+        summary = {'added': len(added), 'updated': len(updated), 'removed': len(removed),
+                   'version': self.catalog_version}
+        print(f"✓ Catalogue rechargé : {summary}")
+        return summary
+
     def create_user_profile(self, answers):
         """
         Crée une description en langage naturel des préférences de l'utilisateur
         à partir des réponses du chatbot.
         """
+        # Joindre toutes les parties en une description cohérente
+        return ' '.join(fragment for _, fragment in self.profile_fragments(answers))
+
+    def profile_fragments(self, answers):
+        """
+        Fragments de la description du profil, un par réponse : [(clé de la question, phrase), ...]
+        dans l'ordre de create_user_profile (les réponses sans phrase sont omises).
+        """
         profile_parts = []
         
         # Mappage pour l'énergie
@@ -90,7 +734,7 @@ class AnimalMatcher:
                 'medium': 'un animal modérément actif avec une énergie équilibrée',
                 'low': 'un animal calme et relaxé qui apprécie les moments de tranquillité'
             }
-            profile_parts.append(f"Je recherche {energy_map.get(answers['energy_preference'], 'un animal')}.")
+            profile_parts.append(('energy_preference', f"Je recherche {energy_map.get(answers['energy_preference'], 'un animal')}."))
         
         # Mappage pour l'amitié
         if 'friendliness_preference' in answers:
@@ -99,7 +743,7 @@ class AnimalMatcher:
                 'medium': 'amical mais pas trop pot de colle',
                 'low': 'indépendant et réservé, pas toujours à la recherche d\'attention'
             }
-            profile_parts.append(f"Cet animal doit être {friend_map.get(answers['friendliness_preference'], 'amical')}.")
+            profile_parts.append(('friendliness_preference', f"Cet animal doit être {friend_map.get(answers['friendliness_preference'], 'amical')}."))
         
         # Mappage pour l'âge
         if 'age_preference' in answers:
@@ -108,7 +752,7 @@ class AnimalMatcher:
                 'adult': 'Je préfère un animal adulte avec une personnalité bien établie',
                 'senior': 'Je préfère un animal senior au tempérament très calme'
             }
-            profile_parts.append(age_map.get(answers['age_preference'], ''))
+            profile_parts.append(('age_preference', age_map.get(answers['age_preference'], '')))
             
         # Mappage pour le type d'habitat
         if 'home_type' in answers:
@@ -118,7 +762,7 @@ class AnimalMatcher:
                 'active': 'qui convient à un foyer très actif et mouvementé',
                 'quiet': 'qui s\'adapte à un foyer calme et paisible'
             }
-            profile_parts.append(f"L'animal devrait être {home_map.get(answers['home_type'], '')}.")
+            profile_parts.append(('home_type', f"L'animal devrait être {home_map.get(answers['home_type'], '')}."))
             
         # Mappage pour l'expérience
         if 'experience' in answers:
@@ -126,77 +770,336 @@ class AnimalMatcher:
                 'first_time': 'Je suis un primo-adoptant',
                 'experienced': 'Je suis un adoptant expérimenté'
             }
-            profile_parts.append(exp_map.get(answers['experience'], ''))
+            profile_parts.append(('experience', exp_map.get(answers['experience'], '')))
             
         # Préférence d'espèce (filtrage simple)
         if 'species_preference' in answers and answers['species_preference'] != 'no preference':
-            profile_parts.append(f"Mon choix se porte sur l'espèce : {answers['species_preference'].lower()}.")
+            profile_parts.append(('species_preference', f"Mon choix se porte sur l'espèce : {answers['species_preference'].lower()}."))
 
         # Enfants
         if 'children' in answers and answers['children']:
-            profile_parts.append("L'animal doit être à l'aise avec les enfants.")
+            profile_parts.append(('children', "L'animal doit être à l'aise avec les enfants."))
         
-        # Joindre toutes les parties en une description cohérente
-        user_profile = ' '.join(filter(None, profile_parts))
-        return user_profile
+        return [(key, fragment) for key, fragment in profile_parts if fragment]
     
-    def find_matches(self, user_answers):
+    def get_user_vector(self, answers):
         """
-        Trouve les animaux les plus compatibles basés sur les préférences de l'utilisateur.
-        
-        Args:
-            user_answers: Dictionnaire des réponses de l'utilisateur.
-            
+        Retourne le vecteur du profil utilisateur.
+
+        La table pré-calculée puis le LRU sont consultés avant d'encoder la phrase de profil
+        (sauf repli sur l'encodeur de secours : le cache contient des vecteurs du modèle).
+        """
+        vector = self.profile_cache.get(answers) if self.profile_cache.model_name == encoder_name() else None
+        metrics.CACHE_TOTAL.inc(cache='profile', result='miss' if vector is None else 'hit')
+        if vector is None:
+            with metrics.stage('encode_profile'):
+                vector = get_vector(self.create_user_profile(answers))
+            if get_model():
+                self.profile_cache.put(answers, vector)
+        return vector
+
+    def get_user_vectors(self, answers_list):
+        """Vecteurs de plusieurs profils : les profils absents du cache sont encodés en un seul lot."""
+        vectors = np.empty((len(answers_list), VECTOR_DIMENSION), dtype=np.float32)
+        missing = {}
+        use_cache = self.profile_cache.model_name == encoder_name()
+        for i, answers in enumerate(answers_list):
+            vector = self.profile_cache.get(answers) if use_cache else None
+            metrics.CACHE_TOTAL.inc(cache='profile', result='miss' if vector is None else 'hit')
+            if vector is None:
+                missing.setdefault(self.create_user_profile(answers), []).append(i)
+            else:
+                vectors[i] = vector
+
+        if missing:
+            encoded = encode_batch(list(missing), batch_size=self.batch_size, show_progress=False)
+            for positions, vector in zip(missing.values(), encoded):
+                vectors[positions] = vector
+                if get_model():
+                    for i in positions:
+                        self.profile_cache.put(answers_list[i], vector)
+        return vectors
+
+    def precompute_profiles(self, questions):
+        """Encode hors ligne toutes les combinaisons de réponses possibles du chatbot."""
+        if not self.cache_dir or not get_model():
+            print("⚠️ AVERTISSEMENT : Pré-calcul des profils impossible sans cache ni modèle NLP.")
+            return
+        self.profile_cache.build(
+            questions,
+            self.create_user_profile,
+            lambda texts: encode_batch(texts, batch_size=self.batch_size, n_workers=self.n_workers),
+        )
+
+    def fragment_vector(self, fragment):
+        """Embedding d'un fragment de profil, encodé une seule fois puis gardé en mémoire."""
+        with self._fragment_lock:
+            vector = self.fragment_vectors.get(fragment)
+        if vector is None:
+            vector = np.asarray(get_vector(fragment), dtype=np.float32)
+            if get_model():
+                with self._fragment_lock:
+                    self.fragment_vectors[fragment] = vector
+        return vector
+
+    def precompute_fragments(self, questions):
+        """Encode en un seul lot les fragments de toutes les réponses possibles du chatbot."""
+        fragments = {
+            fragment
+            for q in questions if q.get('options')
+            for option in q['options']
+            for _, fragment in self.profile_fragments({q['key']: option['value']})
+        }
+        missing = sorted(fragments - set(self.fragment_vectors))
+        if not missing or not get_model():
+            return
+        encoded = encode_batch(missing, batch_size=self.batch_size, show_progress=False)
+        with self._fragment_lock:
+            self.fragment_vectors.update(zip(missing, encoded))
+
+    def compose_user_vector(self, answers):
+        """
+        Vecteur du profil composé à partir des embeddings de ses fragments, sans encoder la phrase entière.
+
+        Chaque fragment (normalisé) est pondéré par son nombre de mots, ce qui approche le
+        mean pooling du modèle sur la phrase complète. Vecteur nul si aucune réponse n'a de fragment.
+        """
+        vector = np.zeros(VECTOR_DIMENSION, dtype=np.float32)
+        for _, fragment in self.profile_fragments(answers):
+            fragment_vector = self.fragment_vector(fragment)
+            norm = np.linalg.norm(fragment_vector)
+            vector += len(fragment.split()) * fragment_vector / (norm or 1.0)
+        return vector
+
+    def _progressive_rows(self, state, answers, user_vector, size, candidates=None):
+        """Lignes et similarités des `size` meilleurs animaux pour le profil composé (voir progressive_shortlist)."""
+        empty = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32))
+        if not user_vector.any():
+            return empty
+        filter_key = self._filter_key(answers)
+        if candidates is None:
+            index = state.indexes.get(filter_key)
+            if index is None or not len(index):
+                return empty
+            return self._query_index(index, state.vectors, user_vector, size)
+
+        # Re-score des seuls candidats encore présents dans le catalogue et conformes au filtre d'espèce
+        id_to_row = state.records.id_to_row
+        rows = np.array([id_to_row[i] for i in candidates if i in id_to_row], dtype=np.int64)
+        if filter_key != NO_PREFERENCE:
+            rows = rows[state.attributes.bitmap('species', filter_key)[rows]]
+        return rerank(state.vectors[rows], rows, user_vector, size)
+
+    def progressive_shortlist(self, answers, size=50, candidates=None):
+        """
+        Shortlist des `size` animaux les plus proches d'un profil partiel, mise à jour à chaque réponse.
+
+        Le vecteur du profil est composé des fragments déjà répondus (compose_user_vector).
+        Avec `candidates` (ids d'une shortlist précédente), seuls ces animaux sont re-scorés.
+
         Returns:
-            DataFrame avec les animaux les plus compatibles et leur score de matching.
+            Liste des ids, du plus au moins compatible.
+        """
+        if self.indexes is None:
+            self.train_knn()
+        user_vector = self.compose_user_vector(answers)
+        # Après l'encodage du profil : le catalogue doit venir du même encodeur
+        self._align_encoder()
+        state = self._snapshot()
+        rows, _ = self._progressive_rows(state, answers, user_vector, size, candidates)
+        return state.df['id'].to_numpy()[rows].tolist()
+
+    def progressive_matches(self, answers, shortlist=None):
+        """
+        Fiches finales du matching progressif : la shortlist construite pendant le chat est
+        re-scorée avec le profil complet (sans shortlist, tout l'index est interrogé).
         """
-        if self.knn_model is None:
+        if self.indexes is None:
+            self.train_knn()
+        with metrics.stage('progressive_matches'):
+            user_vector = self.compose_user_vector(answers)
+            self._align_encoder()
+            state = self._snapshot()
+            rows, scores = self._progressive_rows(state, answers, user_vector, self.n_neighbors, shortlist)
+            if not len(rows):
+                rows, scores = self._fallback_rows(state.df)
+            return state.records.matches(rows, scores)
+
+    @staticmethod
+    def _filter_key(answers):
+        """Clé de l'index à utiliser selon la préférence d'espèce."""
+        species_pref = answers.get('species_preference')
+        if species_pref and species_pref != NO_PREFERENCE:
+            return species_pref.lower()
+        return NO_PREFERENCE
+
+    def _fallback_rows(self, df):
+        """Si aucun match après le filtre strict, retourner les 5 premiers chiens/chats par défaut."""
+        rows = np.flatnonzero(df['species'].isin(['Dog', 'Cat']).to_numpy())[:self.n_neighbors]
+        return rows, np.zeros(len(rows))
+
+    @staticmethod
+    def _matches_frame(df, rows, scores):
+        """Récupère uniquement les animaux matchés avec leur score de similarité (en %)."""
+        matches = df.iloc[rows].copy()
+        matches['match_score'] = (np.asarray(scores, dtype=np.float64) * 100).round(3)
+        return matches
+
+    def _search(self, user_answers):
+        """
+        Recherche les lignes les plus compatibles.
+
+        Returns:
+            (catalogue, fiches, lignes, similarités) issus d'un même état du catalogue.
+        """
+        if self.indexes is None:
             # Re-entraînement si nécessaire, bien que nous le fassions au démarrage dans app.py
             self.train_knn()
         
         # 1. Créer le profil utilisateur
-        user_profile = self.create_user_profile(user_answers)
+        with metrics.stage('profile'):
+            user_profile = self.create_user_profile(user_answers)
         print(f"\nProfil Utilisateur Généré: {user_profile}\n")
         
-        # 2. Filtrage simple (Espèce)
-        filtered_df = self.df.copy()
+        # 2. Convertir le profil utilisateur en vecteur, avant de lire le catalogue : s'il a été
+        # encodé par l'encodeur de secours, le catalogue est d'abord ré-encodé (voir _align_encoder)
+        with metrics.stage('user_vector'):
+            user_vector = self.get_user_vector(user_answers)
+        self._align_encoder()
+        state = self._snapshot()
+        df, records = state.df, state.records
         
-        species_pref = user_answers.get('species_preference')
-        if species_pref and species_pref != 'no preference':
-            filtered_df = filtered_df[filtered_df['species'].str.lower() == species_pref.lower()]
-
-        # Si le filtrage ne laisse plus d'animaux, retourner un DF vide
-        if filtered_df.empty:
-             # Si aucun match après le filtre strict, retourner les 5 meilleurs chiens/chats par défaut
-             fallback_df = self.df[self.df['species'].isin(['Dog', 'Cat'])].head(self.n_neighbors).copy()
-             fallback_df['match_score'] = 0
-             return fallback_df 
+        # 3. Filtrage simple (Espèce) : sélection de l'index pré-construit
+        index = state.indexes.get(self._filter_key(user_answers))
+
+        # Si le filtrage ne laisse plus d'animaux, retourner les animaux par défaut
+        if index is None or len(index) == 0:
+             rows, scores = self._fallback_rows(df)
+             return df, records, rows, scores
         
-        # 3. Trouver les embeddings correspondants dans le DF filtré
-        filtered_indices = filtered_df.index.tolist()
-        filtered_vectors = self.animal_vectors[filtered_indices]
+        # 4. Trouver les voisins les plus proches (lignes déjà triées par score)
+        with metrics.stage('search'):
+            rows, scores = self._rank(state, user_answers, index, user_vector)
+        if not len(rows):
+             rows, scores = self._fallback_rows(df)
+        return df, records, rows, scores
 
-        # 4. Entraîner un KNN temporaire sur le sous-ensemble filtré
-        temp_knn = NearestNeighbors(n_neighbors=min(self.n_neighbors, len(filtered_vectors)), metric='cosine', algorithm='brute')
-        temp_knn.fit(filtered_vectors)
+    def _rank(self, state, user_answers, index, user_vector):
+        """Classe les animaux pour un profil : similarité seule, ou score hybride (scoring.py)."""
+        if self.scoring == 'hybrid':
+            # Élagage par les index d'attributs avant tout calcul vectoriel
+            filter_key = self._filter_key(user_answers)
+            if filter_key == NO_PREFERENCE:
+                base_mask = np.ones(len(state.df), dtype=bool)
+            else:
+                base_mask = state.attributes.bitmap('species', filter_key)
+            return self.scorer.search(user_answers, user_vector, state.vectors, state.attributes,
+                                      base_mask, self.n_neighbors)
+        return self._query_index(index, state.vectors, user_vector)
 
-        # 5. Convertir le profil utilisateur en vecteur
-        user_vector = get_vector(user_profile).reshape(1, -1)
-        
-        # 6. Trouver les voisins les plus proches dans le sous-ensemble filtré
-        distances, indices = temp_knn.kneighbors(user_vector)
-        
-        # 7. Mapper les indices retournés à l'index original du DataFrame
-        original_indices = [filtered_indices[i] for i in indices[0]]
-        
-        # 8. Récupérer les animaux matchés
-        matches = self.df.loc[original_indices].copy()
-        
-        # 9. Calculer le score de similarité
-        matches['match_score'] = 1 - distances[0]
-        matches['match_score'] = (matches['match_score'] * 100).round(3)
-        
-        # Optionnel: Classer par score (bien que KNN le fasse par défaut)
-        matches = matches.sort_values(by='match_score', ascending=False)
+    def _query_index(self, index, vectors, user_vector, k=None):
+        """
+        Interroge un index (k voisins, n_neighbors par défaut). Les index compacts (scores approximatifs)
+        renvoient plus de candidats, re-scorés ensuite en pleine précision à partir des embeddings du catalogue.
+        """
+        k = k or self.n_neighbors
+        if getattr(index, 'approximate_scores', False):
+            rows, _ = index.search(user_vector, k * index.rerank)
+            return rerank(vectors[rows], rows, user_vector, k)
+        return index.search(user_vector, k)
+
+    def find_matches(self, user_answers):
+        """
+        Trouve les animaux les plus compatibles basés sur les préférences de l'utilisateur.
         
-        return matches
+        Args:
+            user_answers: Dictionnaire des réponses de l'utilisateur.
+            
+        Returns:
+            DataFrame avec les animaux les plus compatibles et leur score de matching.
+        """
+        df, _, rows, scores = self._search(user_answers)
+        with metrics.stage('matches_frame'):
+            return self._matches_frame(df, rows, scores)
+
+    def match_records(self, user_answers):
+        """
+        Comme find_matches, mais retourne directement les fiches (liste de dictionnaires)
+        depuis le RecordStore, sans DataFrame intermédiaire.
+        """
+        _, records, rows, scores = self._search(user_answers)
+        with metrics.stage('match_records'):
+            return records.matches(rows, scores)
+
+    def similar_animals(self, pet_id, k=None):
+        """
+        Animaux similaires à `pet_id` (même espèce), lus dans le graphe pré-calculé :
+        liste de fiches avec leur score de similarité (en %), vide si le graphe est désactivé,
+        None si l'animal n'est pas dans le catalogue.
+        """
+        if self.records is None:
+            self.train_knn()
+        state = self._snapshot()
+        row = state.records.id_to_row.get(pet_id)
+        if row is None:
+            return None
+        if state.similar is None:
+            return []
+        rows, scores = state.similar.similar(row, k)
+        return state.records.matches(rows, scores)
+
+    def get_pet(self, pet_id):
+        """Fiche d'un animal par son id (temps constant), ou None s'il est introuvable."""
+        if self.records is None:
+            self.train_knn()
+        return self.records.get(pet_id)
+
+    def iter_matches_batch(self, answers_list):
+        """
+        Matching groupé de plusieurs questionnaires.
+
+        Les profils sont encodés en un seul lot, puis scorés par un produit matriciel par
+        filtre d'espèce. Les résultats sont produits au fil de l'eau, groupe par groupe.
+
+        Yields:
+            (position dans answers_list, DataFrame des matches).
+        """
+        if self.indexes is None:
+            self.train_knn()
+        vectors = self.get_user_vectors(answers_list)
+        # Après l'encodage des profils : le catalogue doit venir du même encodeur
+        self._align_encoder()
+        state = self._snapshot()
+        df = state.df
+
+        groups = {}
+        for i, answers in enumerate(answers_list):
+            groups.setdefault(self._filter_key(answers), []).append(i)
+
+        for key, positions in groups.items():
+            index = state.indexes.get(key)
+            if index is None or len(index) == 0:
+                rows, scores = self._fallback_rows(df)
+                for i in positions:
+                    yield i, self._matches_frame(df, rows, scores)
+                continue
+
+            if self.scoring == 'hybrid' or getattr(index, 'approximate_scores', False):
+                results = [self._rank(state, answers_list[i], index, vectors[i]) for i in positions]
+                rows, scores = [r for r, _ in results], [sc for _, sc in results]
+            else:
+                rows, scores = index.search_batch(vectors[positions], self.n_neighbors)
+            for i, match_rows, match_scores in zip(positions, rows, scores):
+                yield i, self._matches_frame(df, match_rows, match_scores)
+
+    def find_matches_batch(self, answers_list):
+        """
+        Trouve les matches de plusieurs utilisateurs à la fois.
+
+        Returns:
+            Liste de DataFrames, dans l'ordre de `answers_list`.
+        """
+        results = [None] * len(answers_list)
+        for i, matches in self.iter_matches_batch(answers_list):
+            results[i] = matches
+        return results
@@ -0,0 +1,29 @@
+import argparse
+
+from encoders import ENCODER_BACKENDS
+from matching import AnimalMatcher, configure_encoder
+from questions import CHAT_QUESTIONS
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pré-calcule les embeddings du catalogue et des profils dans le cache disque.")
+    parser.add_argument('--csv', default='data/animals.csv', help="Chemin du catalogue CSV")
+    parser.add_argument('--cache-dir', default='data/cache', help="Dossier du cache d'embeddings")
+    parser.add_argument('--batch-size', type=int, default=64, help="Taille des lots envoyés au modèle")
+    parser.add_argument('--workers', type=int, default=0, help="Nombre de processus d'encodage (0 = processus courant)")
+    parser.add_argument('--encoder', default='transformer', choices=ENCODER_BACKENDS,
+                        help="Moteur d'encodage (voir encoders.py)")
+    parser.add_argument('--encoder-threads', type=int, help="Threads PyTorch de l'encodeur")
+    parser.add_argument('--profiles', action='store_true', help="Pré-calcule aussi la table des profils utilisateur")
+    args = parser.parse_args()
+
+    configure_encoder(args.encoder, args.encoder_threads)
+    matcher = AnimalMatcher(csv_path=args.csv, cache_dir=args.cache_dir,
+                            batch_size=args.batch_size, n_workers=args.workers)
+    matcher.prepare_embeddings()
+    if args.profiles:
+        matcher.precompute_profiles(CHAT_QUESTIONS)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+import itertools
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Réponses du chatbot qui influencent le profil généré par create_user_profile
+PROFILE_KEYS = (
+    'species_preference', 'energy_preference', 'friendliness_preference',
+    'age_preference', 'home_type', 'experience', 'children',
+)
+
+
+def normalize_answers(answers):
+    """Clé canonique (chaîne JSON) d'un dictionnaire de réponses."""
+    normalized = {}
+    for key in PROFILE_KEYS:
+        if key not in answers:
+            continue
+        value = answers[key]
+        if key == 'children':
+            value = bool(value)
+        elif isinstance(value, str):
+            value = value.strip()
+            if key == 'species_preference':
+                # L'espèce est toujours comparée en minuscules
+                value = value.lower()
+        normalized[key] = value
+    return json.dumps(normalized, sort_keys=True, ensure_ascii=False)
+
+
+def iter_answer_combinations(questions):
+    """Génère toutes les combinaisons de réponses atteignables via les options du chatbot."""
+    keys = [q['key'] for q in questions if q.get('options')]
+    values = [[opt['value'] for opt in q['options']] for q in questions if q.get('options')]
+    for combination in itertools.product(*values):
+        yield dict(zip(keys, combination))
+
+
+class ProfileVectorCache:
+    """
+    Vecteurs des profils utilisateur, indexés par les réponses normalisées.
+
+    La table pré-calculée (toutes les combinaisons du chatbot) est stockée sur disque
+    à côté du cache d'embeddings; les réponses hors table passent par un LRU en mémoire.
+    """
+
+    def __init__(self, cache_dir="data/cache", model_name="all-MiniLM-L6-v2", dim=384, lru_size=1024):
+        self.cache_dir = cache_dir
+        self.model_name = model_name
+        self.dim = dim
+        self.lru_size = lru_size
+        self.lru = OrderedDict()
+        self.lru_lock = threading.Lock()
+        self.vectors = None
+        self.index = {}
+        if cache_dir:
+            safe_name = model_name.replace('/', '_')
+            self.vectors_path = os.path.join(cache_dir, f"profiles_{safe_name}.npy")
+            self.index_path = os.path.join(cache_dir, f"profiles_{safe_name}.json")
+            self.load()
+
+    def load(self):
+        """Charge la table pré-calculée (en memory-map) si elle existe."""
+        if not (os.path.exists(self.vectors_path) and os.path.exists(self.index_path)):
+            return
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            vectors = np.load(self.vectors_path, mmap_mode='r')
+        except (OSError, ValueError) as e:
+            print(f"⚠️ AVERTISSEMENT : Table des profils illisible ({e}).")
+            return
+
+        keys = meta.get('keys', [])
+        if meta.get('model') != self.model_name or vectors.shape != (len(keys), self.dim):
+            print("⚠️ AVERTISSEMENT : Table des profils incohérente, elle est ignorée.")
+            return
+
+        self.vectors = vectors
+        self.index = {k: i for i, k in enumerate(keys)}
+        print(f"✓ Table de {len(keys)} profils utilisateur chargée.")
+
+    def get(self, answers):
+        """Retourne le vecteur du profil s'il est connu, sinon None."""
+        key = normalize_answers(answers)
+        row = self.index.get(key)
+        if row is not None:
+            return np.asarray(self.vectors[row], dtype=np.float32)
+
+        with self.lru_lock:
+            vector = self.lru.get(key)
+            if vector is not None:
+                self.lru.move_to_end(key)
+        return vector
+
+    def put(self, answers, vector):
+        """Mémorise un vecteur hors table dans le LRU."""
+        key = normalize_answers(answers)
+        if key in self.index:
+            return
+        with self.lru_lock:
+            self.lru[key] = vector
+            self.lru.move_to_end(key)
+            while len(self.lru) > self.lru_size:
+                self.lru.popitem(last=False)
+
+    def build(self, questions, make_profile, encode_fn):
+        """
+        Pré-calcule et sauvegarde le vecteur de chaque combinaison de réponses.
+
+        `make_profile` transforme un dictionnaire de réponses en phrase de profil et
+        `encode_fn` encode une liste de phrases en tableau (n, dim).
+        """
+        combinations = list(iter_answer_combinations(questions))
+        keys = [normalize_answers(a) for a in combinations]
+        profiles = [make_profile(a) for a in combinations]
+
+        # Plusieurs combinaisons peuvent produire la même phrase
+        unique_profiles = list(dict.fromkeys(profiles))
+        position = {p: i for i, p in enumerate(unique_profiles)}
+        print(f"Pré-calcul de {len(combinations)} profils ({len(unique_profiles)} phrases distinctes)...")
+        unique_vectors = np.asarray(encode_fn(unique_profiles), dtype=np.float32)
+        vectors = unique_vectors[[position[p] for p in profiles]]
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_vectors = self.vectors_path + '.tmp.npy'
+        tmp_index = self.index_path + '.tmp'
+        np.save(tmp_vectors, vectors)
+        with open(tmp_index, 'w', encoding='utf-8') as f:
+            json.dump({'model': self.model_name, 'dim': self.dim, 'keys': keys}, f, ensure_ascii=False)
+        os.replace(tmp_vectors, self.vectors_path)
+        os.replace(tmp_index, self.index_path)
+        self.load()
@@ -0,0 +1,66 @@
+# --- Définition des Questions du Chatbot ---
+# Note: L'ordre des questions est important pour la séquence de dialogue
+CHAT_QUESTIONS = [
+    {
+        'key': 'species_preference',
+        'ai_message': "Bonjour ! Je suis l'assistant Pet Match. Ensemble, nous allons trouver ton ami parfait ! Pour commencer, quel type d'animal souhaites-tu adopter ?",
+        'options': [
+            {'label': "Un Chien 🐕", 'value': 'Dog'},
+            {'label': "Un Chat 🐈", 'value': 'Cat'},
+            {'label': "Pas de préférence", 'value': 'no preference'}
+        ]
+    },
+    {
+        'key': 'energy_preference',
+        'ai_message': "Super ! Maintenant, quelle est l'énergie que tu recherches chez ton compagnon ?",
+        'options': [
+            {'label': "Haute (très actif, joueur)", 'value': 'high'},
+            {'label': "Moyenne (équilibré, balades régulières)", 'value': 'medium'},
+            {'label': "Basse (calme, relax, siestes)", 'value': 'low'}
+        ]
+    },
+    {
+        'key': 'friendliness_preference',
+        'ai_message': "Et quel niveau d'affection cherches-tu ? Préfères-tu un animal très proche ou plus indépendant ?",
+        'options': [
+            {'label': "Très affectueux (pot de colle)", 'value': 'high'},
+            {'label': "Amical (indépendant mais gentil)", 'value': 'medium'},
+            {'label': "Indépendant (réservé, solitaire)", 'value': 'low'}
+        ]
+    },
+    {
+        'key': 'age_preference',
+        'ai_message': "Quel âge préfères-tu pour ton futur ami ? (L'âge influence souvent le niveau d'activité)",
+        'options': [
+            {'label': "Jeune (plus de travail mais très joueur)", 'value': 'young'},
+            {'label': "Adulte (personnalité stable)", 'value': 'adult'},
+            {'label': "Senior (tranquille et posé)", 'value': 'senior'}
+        ]
+    },
+    {
+        'key': 'home_type',
+        'ai_message': "Quel est ton environnement de vie ? (Pour évaluer les besoins en espace)",
+        'options': [
+            {'label': "Appartement (milieu urbain)", 'value': 'apartment'},
+            {'label': "Maison avec jardin", 'value': 'house_yard'},
+            {'label': "Foyer très actif (beaucoup de visiteurs/mouvement)", 'value': 'active'},
+            {'label': "Foyer très calme et paisible", 'value': 'quiet'}
+        ]
+    },
+    {
+        'key': 'experience',
+        'ai_message': "Enfin, as-tu déjà eu des animaux de compagnie ?",
+        'options': [
+            {'label': "Oui, je suis expérimenté", 'value': 'experienced'},
+            {'label': "Non, ce sera mon premier animal", 'value': 'first_time'}
+        ]
+    },
+    {
+        'key': 'children',
+        'ai_message': "Y a-t-il des enfants (moins de 12 ans) dans ton foyer ?",
+        'options': [
+            {'label': "Oui", 'value': True},
+            {'label': "Non", 'value': False}
+        ]
+    },
+]
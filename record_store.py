@@ -0,0 +1,45 @@
+class RecordStore:
+    """
+    Fiches d'affichage des animaux, optimisées pour la lecture.
+
+    Chaque animal est stocké une seule fois sous forme de tuple (valeurs Python natives,
+    dans l'ordre de `fields`), avec un index id -> ligne : une fiche s'obtient en temps
+    constant, sans passer par pandas.
+    """
+
+    def __init__(self, df):
+        self.fields = tuple(df.columns)
+        self.rows = [tuple(record.values()) for record in df.to_dict('records')]
+        self.id_to_row = {record[self.fields.index('id')]: i for i, record in enumerate(self.rows)}
+
+    def __len__(self):
+        return len(self.rows)
+
+    def get(self, pet_id):
+        """Fiche de l'animal (dictionnaire) ou None s'il n'est pas dans le catalogue."""
+        row = self.id_to_row.get(pet_id)
+        if row is None:
+            return None
+        return dict(zip(self.fields, self.rows[row]))
+
+    def matches(self, rows, scores):
+        """Fiches des lignes matchées, avec leur score de similarité (en %)."""
+        return [
+            {**dict(zip(self.fields, self.rows[row])), 'match_score': round(float(score) * 100, 3)}
+            for row, score in zip(rows, scores)
+        ]
+
+    def patched(self, keep, new_df, order=None):
+        """
+        Copie du store sans les lignes où `keep` est faux, avec les lignes de `new_df` ajoutées
+        (puis réordonnées selon `order`, ex. tri par espèce du catalogue).
+        """
+        store = RecordStore.__new__(RecordStore)
+        store.fields = self.fields
+        store.rows = [row for row, kept in zip(self.rows, keep) if kept]
+        store.rows += [tuple(r.values()) for r in new_df.reindex(columns=list(self.fields)).to_dict('records')]
+        if order is not None:
+            store.rows = [store.rows[i] for i in order]
+        id_position = self.fields.index('id')
+        store.id_to_row = {row[id_position]: i for i, row in enumerate(store.rows)}
+        return store
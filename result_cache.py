@@ -0,0 +1,51 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from profile_cache import normalize_answers
+
+
+class ResultCache:
+    """
+    Cache serveur des résultats de matching.
+
+    Les entrées expirent après `ttl` secondes et les moins récemment utilisées sont
+    évincées au-delà de `max_size` entrées.
+    """
+
+    def __init__(self, max_size=1024, ttl=3600):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def make_key(answers, catalog_version):
+        """Clé courte (stockable en session) dérivée des réponses et de la version du catalogue."""
+        payload = f"{catalog_version}\x00{normalize_answers(answers)}".encode('utf-8')
+        return hashlib.sha1(payload).hexdigest()[:20]
+
+    def get(self, key):
+        """Retourne les résultats associés à la clé, ou None s'ils sont absents ou expirés."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        """Mémorise des résultats, en évinçant les entrées les plus anciennes si nécessaire."""
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self.entries)
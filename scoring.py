@@ -0,0 +1,135 @@
+import numpy as np
+
+from search import normalize_rows, top_k
+
+# Plages (échelle 1-10) des niveaux produits par generate.py pour high / medium / low
+LEVEL_RANGES = {'high': (7.0, 10.0), 'medium': (4.0, 7.0), 'low': (1.0, 4.0)}
+# Tranches d'âge (en années) utilisées par generate.py pour les traits liés à l'âge
+AGE_RANGES = {'young': (0.0, 2.0), 'adult': (2.0, 7.0), 'senior': (7.0, 99.0)}
+
+# Réponse du chatbot -> (colonne, plages, tolérance hors plage avant un score nul)
+ANSWER_CONSTRAINTS = {
+    'energy_preference': ('energy_level', LEVEL_RANGES, 3.0),
+    'friendliness_preference': ('friendliness_level', LEVEL_RANGES, 3.0),
+    'age_preference': ('age_years', AGE_RANGES, 5.0),
+}
+NUMERIC_COLUMNS = ('energy_level', 'friendliness_level', 'age_years')
+
+DEFAULT_WEIGHTS = {
+    'semantic': 0.6,
+    'energy_level': 0.15,
+    'friendliness_level': 0.15,
+    'age_years': 0.1,
+}
+
+
+class AttributeIndex:
+    """
+    Index pré-calculés sur les colonnes structurées du catalogue.
+
+    Les colonnes numériques sont gardées triées (avec la permutation associée) pour
+    sélectionner une plage par recherche dichotomique; l'espèce est stockée en bitmaps
+    (tableaux de booléens).
+    """
+
+    def __init__(self, df):
+        self.n = len(df)
+        self.values = {}
+        self.sorted_values = {}
+        self.order = {}
+        for col in NUMERIC_COLUMNS:
+            if col in df.columns:
+                values = df[col].to_numpy(dtype=np.float64)
+                order = np.argsort(values, kind='stable')
+                self.values[col] = values
+                self.order[col] = order
+                self.sorted_values[col] = values[order]
+
+        self.bitmaps = {}
+        species = df['species'].str.lower().to_numpy()
+        for name in np.unique(species):
+            self.bitmaps[('species', name)] = species == name
+
+    def range_mask(self, col, low, high):
+        """Bitmap des lignes dont `col` est dans [low, high]."""
+        sorted_values = self.sorted_values[col]
+        start = np.searchsorted(sorted_values, low, side='left')
+        stop = np.searchsorted(sorted_values, high, side='right')
+        mask = np.zeros(self.n, dtype=bool)
+        mask[self.order[col][start:stop]] = True
+        return mask
+
+    def bitmap(self, col, value):
+        """Bitmap des lignes où `col` vaut `value` (toutes à False si la valeur est inconnue)."""
+        mask = self.bitmaps.get((col, value))
+        return mask if mask is not None else np.zeros(self.n, dtype=bool)
+
+
+class HybridScorer:
+    """
+    Score combinant similarité cosinus et contraintes structurées pondérées.
+
+    Les candidats sont d'abord élagués avec l'AttributeIndex (plages élargies de `margin`),
+    puis seuls ces candidats passent par le calcul vectoriel. Si l'élagage laisse moins de
+    k animaux, les contraintes les moins pondérées sont relâchées une à une.
+    """
+
+    def __init__(self, weights=None, margin=1.5):
+        self.weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+        self.margin = margin
+
+    def constraints(self, answers, attributes):
+        """Contraintes (colonne, borne basse, borne haute, tolérance, poids) tirées des réponses."""
+        constraints = []
+        for key, (col, ranges, tolerance) in ANSWER_CONSTRAINTS.items():
+            value = answers.get(key)
+            if value in ranges and col in attributes.values and self.weights.get(col):
+                low, high = ranges[value]
+                constraints.append((col, low, high, tolerance, self.weights[col]))
+        # Les contraintes les plus pondérées sont relâchées en dernier
+        return sorted(constraints, key=lambda c: -c[4])
+
+    def candidates(self, attributes, base_mask, constraints, k):
+        """Lignes candidates après élagage par les index d'attributs."""
+        masks = [attributes.range_mask(col, low - self.margin, high + self.margin)
+                 for col, low, high, _, _ in constraints]
+        for n_kept in range(len(masks), -1, -1):
+            mask = base_mask.copy()
+            for constraint_mask in masks[:n_kept]:
+                mask &= constraint_mask
+            rows = np.flatnonzero(mask)
+            if len(rows) >= k:
+                return rows
+        return rows
+
+    @staticmethod
+    def attribute_scores(attributes, rows, constraints):
+        """Score [0, 1] de chaque contrainte : 1 dans la plage, décroissant linéairement au-delà."""
+        scores = []
+        for col, low, high, tolerance, _ in constraints:
+            values = attributes.values[col][rows]
+            distance = np.maximum(low - values, 0) + np.maximum(values - high, 0)
+            scores.append(np.clip(1 - distance / tolerance, 0, 1))
+        return scores
+
+    def search(self, answers, user_vector, vectors, attributes, base_mask, k):
+        """
+        Retourne (lignes, scores combinés) des k meilleurs animaux parmi `base_mask`.
+
+        `vectors` sont les embeddings (non normalisés) du catalogue.
+        """
+        constraints = self.constraints(answers, attributes)
+        rows = self.candidates(attributes, base_mask, constraints, k)
+        if not len(rows):
+            return rows, np.empty(0)
+
+        semantic = normalize_rows(vectors[rows]) @ normalize_rows(user_vector)[0]
+        total = self.weights['semantic'] * semantic
+        total_weight = self.weights['semantic']
+        for (_, _, _, _, weight), scores in zip(constraints, self.attribute_scores(attributes, rows, constraints)):
+            total = total + weight * scores
+            total_weight += weight
+        combined = total / total_weight
+
+        top = top_k(combined, k)
+        return rows[top], combined[top]
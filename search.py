@@ -0,0 +1,342 @@
+import numpy as np
+
+
+def normalize_rows(vectors):
+    """Normalise chaque vecteur (L2) pour que le produit scalaire soit la similarité cosinus."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors.reshape(1, -1)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def top_k(scores, k):
+    """Positions des k meilleurs scores, triées par score décroissant."""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < len(scores):
+        top = np.argpartition(-scores, k - 1)[:k]
+    else:
+        top = np.arange(len(scores))
+    return top[np.argsort(-scores[top], kind='stable')]
+
+
+def rerank(vectors, rows, query, k):
+    """
+    Re-score des candidats en pleine précision.
+
+    `vectors` sont les embeddings float32 (non normalisés) des lignes candidates `rows`.
+    Retourne (lignes, similarités cosinus) des k meilleurs candidats.
+    """
+    if not len(rows):
+        return rows, np.empty(0, dtype=np.float32)
+    scores = normalize_rows(vectors) @ normalize_rows(query)[0]
+    top = top_k(scores, k)
+    return np.asarray(rows)[top], scores[top]
+
+
+class ExactIndex:
+    """
+    Index de recherche exacte par similarité cosinus.
+
+    Les vecteurs sont normalisés une fois à la construction : une requête se résume
+    à un produit matrice-vecteur suivi d'un argpartition. Avec `normalized=True`, les
+    vecteurs (déjà normalisés, éventuellement en memory-map) sont utilisés sans copie.
+    """
+
+    def __init__(self, vectors, rows, normalized=False):
+        self.rows = np.asarray(rows, dtype=np.int64)
+        if not len(self.rows):
+            self.vectors = np.zeros((0, 0), dtype=np.float32)
+        elif normalized:
+            self.vectors = np.asarray(vectors, dtype=np.float32)
+        else:
+            self.vectors = normalize_rows(vectors)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def search(self, query, k):
+        """Retourne (lignes du catalogue, similarités cosinus) des k plus proches voisins."""
+        if not len(self.rows):
+            return self.rows, np.empty(0, dtype=np.float32)
+        scores = self.vectors @ normalize_rows(query)[0]
+        top = top_k(scores, k)
+        return self.rows[top], scores[top]
+
+    def search_batch(self, queries, k, block_size=256):
+        """
+        Recherche groupée : un produit matriciel par bloc de requêtes.
+
+        Returns:
+            (lignes, similarités), deux tableaux (m, k) triés par score décroissant.
+        """
+        queries = normalize_rows(queries)
+        k = min(k, len(self.rows))
+        all_rows = np.empty((len(queries), k), dtype=np.int64)
+        all_scores = np.empty((len(queries), k), dtype=np.float32)
+        if not k:
+            return all_rows, all_scores
+
+        for start in range(0, len(queries), block_size):
+            scores = queries[start:start + block_size] @ self.vectors.T
+            if k < scores.shape[1]:
+                top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            else:
+                top = np.broadcast_to(np.arange(k), scores.shape).copy()
+            top_scores = np.take_along_axis(scores, top, axis=1)
+            order = np.argsort(-top_scores, axis=1, kind='stable')
+            top = np.take_along_axis(top, order, axis=1)
+            all_rows[start:start + len(top)] = self.rows[top]
+            all_scores[start:start + len(top)] = np.take_along_axis(top_scores, order, axis=1)
+        return all_rows, all_scores
+
+    def patched(self, remap, vectors, rows):
+        """
+        Retourne une copie de l'index après suppression et ajout de vecteurs.
+
+        `remap` donne la nouvelle ligne de chaque ancienne ligne du catalogue (-1 si supprimée);
+        `vectors` / `rows` sont les vecteurs ajoutés et leurs lignes dans le nouveau catalogue.
+        L'index courant n'est pas modifié, les requêtes en cours restent valides.
+        """
+        old_rows = remap[self.rows]
+        keep = old_rows >= 0
+        rows = np.asarray(rows, dtype=np.int64)
+        if not keep.any():
+            return ExactIndex(vectors, rows)
+
+        index = ExactIndex.__new__(ExactIndex)
+        index.rows = np.concatenate([old_rows[keep], rows])
+        index.vectors = self.vectors[keep]
+        if len(rows):
+            index.vectors = np.concatenate([index.vectors, normalize_rows(vectors)])
+        return index
+
+
+class IVFIndex:
+    """
+    Index approximatif de type IVF (inverted file) implémenté avec NumPy.
+
+    Les vecteurs sont répartis en `n_lists` cellules par un k-means sphérique; une requête
+    ne parcourt que les `nprobe` cellules dont le centroïde est le plus proche. Augmenter
+    `nprobe` améliore le rappel au prix de la latence (nprobe = n_lists équivaut à l'exact).
+    """
+
+    def __init__(self, vectors, rows, n_lists=None, nprobe=8, n_iter=10, train_size=None, seed=0,
+                 normalized=False):
+        rows = np.asarray(rows, dtype=np.int64)
+        self.nprobe = nprobe
+        if not len(rows):
+            self.rows = rows
+            self.vectors = np.zeros((0, 0), dtype=np.float32)
+            self.centroids = np.zeros((0, 0), dtype=np.float32)
+            self.offsets = np.zeros(1, dtype=np.int64)
+            return
+
+        vectors = np.asarray(vectors, dtype=np.float32) if normalized else normalize_rows(vectors)
+        n = len(rows)
+        self.n_lists = max(1, min(n_lists or int(np.sqrt(n)), n))
+        self.centroids = self._train(vectors, n_iter, train_size or 64 * self.n_lists, seed)
+
+        # Vecteurs regroupés par cellule pour que chaque liste soit une tranche contiguë
+        assignments = self._assign(vectors)
+        order = np.argsort(assignments, kind='stable')
+        self.vectors = vectors[order]
+        self.rows = rows[order]
+        counts = np.bincount(assignments, minlength=self.n_lists)
+        self.offsets = np.concatenate([[0], np.cumsum(counts)])
+
+    def __len__(self):
+        return len(self.rows)
+
+    def _assign(self, vectors, block_size=65536):
+        """Cellule la plus proche de chaque vecteur (par blocs pour borner la mémoire)."""
+        assignments = np.empty(len(vectors), dtype=np.int64)
+        for start in range(0, len(vectors), block_size):
+            block = vectors[start:start + block_size]
+            assignments[start:start + len(block)] = np.argmax(block @ self.centroids.T, axis=1)
+        return assignments
+
+    def _train(self, vectors, n_iter, train_size, seed):
+        """K-means sphérique sur un échantillon des vecteurs."""
+        rng = np.random.default_rng(seed)
+        sample = vectors
+        if len(vectors) > train_size:
+            sample = vectors[rng.choice(len(vectors), train_size, replace=False)]
+
+        self.centroids = sample[rng.choice(len(sample), self.n_lists, replace=False)].copy()
+        for _ in range(n_iter):
+            assignments = self._assign(sample)
+            sums = np.zeros_like(self.centroids)
+            np.add.at(sums, assignments, sample)
+            empty = np.bincount(assignments, minlength=self.n_lists) == 0
+            # Une cellule vide garde son ancien centroïde
+            sums[empty] = self.centroids[empty]
+            self.centroids = normalize_rows(sums)
+        return self.centroids
+
+    def search(self, query, k):
+        """Retourne (lignes du catalogue, similarités cosinus) des k plus proches voisins approchés."""
+        if not len(self.rows):
+            return self.rows, np.empty(0, dtype=np.float32)
+        query = normalize_rows(query)[0]
+        probes = top_k(self.centroids @ query, self.nprobe)
+        candidates = np.concatenate([
+            np.arange(self.offsets[c], self.offsets[c + 1]) for c in probes
+        ])
+        scores = self.vectors[candidates] @ query
+        top = top_k(scores, k)
+        return self.rows[candidates[top]], scores[top]
+
+    def search_batch(self, queries, k):
+        """Recherche groupée (voir ExactIndex.search_batch); chaque requête parcourt ses propres cellules."""
+        results = [self.search(q, k) for q in normalize_rows(queries)]
+        return [r for r, _ in results], [s for _, s in results]
+
+    def patched(self, remap, vectors, rows):
+        """
+        Retourne une copie de l'index après suppression et ajout de vecteurs (voir ExactIndex.patched).
+
+        Les nouveaux vecteurs sont rangés dans la cellule du centroïde le plus proche, sans
+        ré-entraîner le k-means.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        if not len(self.rows):
+            return IVFIndex(vectors, rows, nprobe=self.nprobe)
+
+        cells = np.repeat(np.arange(self.n_lists), np.diff(self.offsets))
+        old_rows = remap[self.rows]
+        keep = old_rows >= 0
+
+        all_vectors = self.vectors[keep]
+        all_rows = old_rows[keep]
+        all_cells = cells[keep]
+        if len(rows):
+            vectors = normalize_rows(vectors)
+            all_vectors = np.concatenate([all_vectors, vectors])
+            all_rows = np.concatenate([all_rows, rows])
+            all_cells = np.concatenate([all_cells, self._assign(vectors)])
+
+        order = np.argsort(all_cells, kind='stable')
+        index = IVFIndex.__new__(IVFIndex)
+        index.nprobe = self.nprobe
+        index.n_lists = self.n_lists
+        index.centroids = self.centroids
+        index.vectors = all_vectors[order]
+        index.rows = all_rows[order]
+        counts = np.bincount(all_cells, minlength=self.n_lists)
+        index.offsets = np.concatenate([[0], np.cumsum(counts)])
+        return index
+
+
+class QuantizedIndex:
+    """
+    Index compact : vecteurs normalisés stockés en int8 (avec une échelle par vecteur) ou en float16.
+
+    Le premier passage parcourt la représentation compacte par blocs; ses scores sont
+    approximatifs. `approximate_scores` signale à l'appelant qu'il doit re-scorer les
+    `k * rerank` meilleurs candidats en pleine précision (voir rerank et AnimalMatcher._search).
+
+    Les index d'espèce d'un catalogue trié par espèce sont des tranches (vues) des codes de
+    l'index complet (voir sliced) : le catalogue n'est quantifié qu'une fois.
+    """
+
+    approximate_scores = True
+
+    def __init__(self, vectors, rows, dtype='int8', rerank=4, block_size=1024, normalized=False):
+        if dtype not in ('int8', 'float16'):
+            raise ValueError(f"Type de quantification inconnu : '{dtype}' (choix : int8, float16).")
+        self.dtype = dtype
+        self.rerank = rerank
+        self.block_size = block_size
+        self.rows = np.asarray(rows, dtype=np.int64)
+        self.codes, self.scales = self._quantize(vectors if len(self.rows) else np.zeros((0, 1)), normalized)
+
+    def _quantize(self, vectors, normalized=False):
+        """Représentation compacte (codes, échelles) de vecteurs bruts (ou déjà normalisés)."""
+        vectors = np.asarray(vectors, dtype=np.float32) if normalized else normalize_rows(vectors)
+        if self.dtype == 'float16':
+            return vectors.astype(np.float16), np.ones(len(vectors), dtype=np.float32)
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        codes = np.round(vectors / scales[:, None]).astype(np.int8)
+        return codes, scales.astype(np.float32)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def sliced(self, start, stop):
+        """Index des positions [start, stop) de cet index, sans copie des codes."""
+        index = QuantizedIndex.__new__(QuantizedIndex)
+        index.dtype = self.dtype
+        index.rerank = self.rerank
+        index.block_size = self.block_size
+        index.rows = self.rows[start:stop]
+        index.codes = self.codes[start:stop]
+        index.scales = self.scales[start:stop]
+        return index
+
+    @property
+    def nbytes(self):
+        """Mémoire occupée par la représentation compacte."""
+        return self.codes.nbytes + self.scales.nbytes + self.rows.nbytes
+
+    def _approximate_scores(self, query):
+        scores = np.empty(len(self.rows), dtype=np.float32)
+        for start in range(0, len(self.rows), self.block_size):
+            block = self.codes[start:start + self.block_size].astype(np.float32)
+            scores[start:start + len(block)] = block @ query
+        return scores * self.scales
+
+    def search(self, query, k):
+        """Retourne (lignes du catalogue, similarités approximatives) des k meilleurs candidats."""
+        if not len(self.rows):
+            return self.rows, np.empty(0, dtype=np.float32)
+        scores = self._approximate_scores(normalize_rows(query)[0])
+        top = top_k(scores, k)
+        return self.rows[top], scores[top]
+
+    def search_batch(self, queries, k):
+        """Recherche groupée (voir ExactIndex.search_batch)."""
+        results = [self.search(q, k) for q in normalize_rows(queries)]
+        return [r for r, _ in results], [s for _, s in results]
+
+    def patched(self, remap, vectors, rows):
+        """Retourne une copie de l'index après suppression et ajout de vecteurs (voir ExactIndex.patched)."""
+        old_rows = remap[self.rows]
+        keep = old_rows >= 0
+        rows = np.asarray(rows, dtype=np.int64)
+
+        index = QuantizedIndex.__new__(QuantizedIndex)
+        index.dtype = self.dtype
+        index.rerank = self.rerank
+        index.block_size = self.block_size
+        index.rows = np.concatenate([old_rows[keep], rows])
+        index.codes = self.codes[keep]
+        index.scales = self.scales[keep]
+        if len(rows):
+            codes, scales = self._quantize(vectors)
+            index.codes = codes if not keep.any() else np.concatenate([index.codes, codes])
+            index.scales = np.concatenate([index.scales, scales])
+        # Codes rangés dans l'ordre des lignes du catalogue, pour que les index d'espèce
+        # restent des tranches de l'index complet
+        order = np.argsort(index.rows, kind='stable')
+        index.rows, index.codes, index.scales = index.rows[order], index.codes[order], index.scales[order]
+        return index
+
+
+# Moteurs de recherche disponibles pour AnimalMatcher (paramètre `index_backend`)
+INDEX_BACKENDS = {
+    'exact': ExactIndex,
+    'ivf': IVFIndex,
+    'quantized': QuantizedIndex,
+}
+
+
+def build_index(backend, vectors, rows, **params):
+    """Construit un index du moteur `backend` sur les vecteurs donnés."""
+    if backend not in INDEX_BACKENDS:
+        raise ValueError(f"Moteur d'index inconnu : '{backend}' (choix : {', '.join(INDEX_BACKENDS)}).")
+    return INDEX_BACKENDS[backend](vectors, rows, **params)
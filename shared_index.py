@@ -0,0 +1,261 @@
+"""
+Catalogue et embeddings partagés entre processus par mémoire partagée.
+
+Un processus chargeur construit le catalogue une seule fois (un seul modèle NLP, un seul
+encodage) et le publie; chaque worker WSGI s'y attache en lecture seule au lieu de
+garder sa propre copie des embeddings. Chaque publication crée des segments versionnés :
+    <préfixe>_ctl        version courante (int64), lue par les workers
+    <préfixe>_v<N>_vec   embeddings normalisés (float32), triés par espèce
+    <préfixe>_v<N>_df    catalogue sérialisé (pickle), précédé de (n, dim, taille, encodeur)
+
+Les workers utilisent le chemin de catalogue 'shm://<préfixe>' (variable CATALOG_PATH) et
+rechargent une nouvelle version publiée sans redémarrer (voir app.watch_catalog).
+
+Usage (processus chargeur, à lancer avant les workers) :
+    python shared_index.py --csv data/animals.csv --prefix petmatch --watch 5
+"""
+import argparse
+import os
+import pickle
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from catalog_bundle import sort_by_species
+from encoders import ENCODER_BACKENDS
+
+SHARED_SCHEME = 'shm://'
+HEADER = np.dtype([('n', '<i8'), ('dim', '<i8'), ('size', '<i8'), ('encoder', 'S128')])
+
+
+def is_shared(path):
+    """Indique si un chemin de catalogue désigne un catalogue en mémoire partagée."""
+    return isinstance(path, str) and path.startswith(SHARED_SCHEME)
+
+
+def _prefix(path):
+    return path[len(SHARED_SCHEME):] if is_shared(path) else path
+
+
+def _attach(name):
+    """Ouvre un segment existant sans le confier au resource_tracker (qui le supprimerait à la sortie du worker)."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 : pas de paramètre track
+        segment = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(segment._name, 'shared_memory')
+        return segment
+
+
+def _create(name, size):
+    """Crée un segment, en remplaçant un segment orphelin laissé par un chargeur arrêté brutalement."""
+    try:
+        return shared_memory.SharedMemory(name=name, create=True, size=size)
+    except FileExistsError:
+        stale = shared_memory.SharedMemory(name=name)
+        stale.close()
+        stale.unlink()
+        return shared_memory.SharedMemory(name=name, create=True, size=size)
+
+
+class SharedCatalogPublisher:
+    """
+    Publie des versions successives du catalogue en mémoire partagée.
+
+    Le processus qui publie est propriétaire des segments : la version précédente est
+    conservée le temps que les workers basculent, les plus anciennes sont supprimées.
+    """
+
+    def __init__(self, prefix='petmatch'):
+        self.prefix = prefix
+        self.version = 0
+        self.segments = {}
+        try:
+            self.control = shared_memory.SharedMemory(name=f"{prefix}_ctl", create=True, size=8)
+        except FileExistsError:
+            # Segment laissé par un chargeur précédent : on reprend sa numérotation
+            self.control = shared_memory.SharedMemory(name=f"{prefix}_ctl")
+            self.version = int(np.ndarray((1,), dtype=np.int64, buffer=self.control.buf)[0])
+        self.control_version = np.ndarray((1,), dtype=np.int64, buffer=self.control.buf)
+
+    def publish(self, df, vectors, encoder):
+        """
+        Publie un catalogue et ses embeddings, produits par l'encodeur nommé `encoder`
+        (voir matching.encoder_name); retourne le numéro de la nouvelle version.
+        """
+        df, vectors = sort_by_species(df, vectors)
+        version = self.version + 1
+        payload = pickle.dumps(df, protocol=pickle.HIGHEST_PROTOCOL)
+
+        vec_segment = _create(f"{self.prefix}_v{version}_vec", max(vectors.nbytes, 1))
+        np.ndarray(vectors.shape, dtype=np.float32, buffer=vec_segment.buf)[:] = vectors
+
+        df_segment = _create(f"{self.prefix}_v{version}_df", HEADER.itemsize + len(payload))
+        header = np.ndarray((1,), dtype=HEADER, buffer=df_segment.buf)
+        header[0] = (len(df), vectors.shape[1], len(payload), encoder.encode('utf-8'))
+        df_segment.buf[HEADER.itemsize:HEADER.itemsize + len(payload)] = payload
+        del header
+
+        self.segments[version] = (vec_segment, df_segment)
+        # La version n'est publiée qu'une fois les segments complets
+        self.control_version[0] = version
+        self.version = version
+
+        for old in [v for v in self.segments if v < version - 1]:
+            for segment in self.segments.pop(old):
+                segment.close()
+                segment.unlink()
+        print(f"✓ Catalogue v{version} publié en mémoire partagée ({len(df)} animaux, "
+              f"{vectors.nbytes / 1e6:.1f} Mo d'embeddings).")
+        return version
+
+    def close(self):
+        """Supprime tous les segments publiés."""
+        for segments in self.segments.values():
+            for segment in segments:
+                segment.close()
+                segment.unlink()
+        self.segments = {}
+        del self.control_version
+        self.control.close()
+        self.control.unlink()
+
+
+class SharedCatalogReader:
+    """Accès en lecture seule, côté worker, aux catalogues publiés par SharedCatalogPublisher."""
+
+    def __init__(self, prefix='petmatch'):
+        self.prefix = prefix
+        self.control = _attach(f"{prefix}_ctl")
+        self.segments = {}
+        self.lock = threading.Lock()
+
+    @property
+    def version(self):
+        """Dernière version publiée (0 si aucune)."""
+        return int(np.ndarray((1,), dtype=np.int64, buffer=self.control.buf)[0])
+
+    def load(self, retries=5):
+        """
+        Attache la dernière version publiée.
+
+        Returns:
+            (version, df, vectors, encoder) : vectors est une vue en lecture seule sur la mémoire
+            partagée, encoder le nom de l'encodeur qui l'a produit.
+        """
+        for _ in range(retries):
+            version = self.version
+            if version == 0:
+                raise FileNotFoundError(f"Aucun catalogue publié sous le préfixe '{self.prefix}'.")
+            try:
+                return (version, *self._load_version(version))
+            except FileNotFoundError:
+                # Version supprimée entre la lecture du numéro et l'ouverture des segments
+                time.sleep(0.05)
+        raise FileNotFoundError(f"Catalogue partagé '{self.prefix}' introuvable.")
+
+    def _load_version(self, version):
+        with self.lock:
+            if version not in self.segments:
+                self.segments[version] = (_attach(f"{self.prefix}_v{version}_vec"),
+                                          _attach(f"{self.prefix}_v{version}_df"))
+                self._release_old(version)
+            vec_segment, df_segment = self.segments[version]
+
+        n, dim, size, encoder = np.ndarray((1,), dtype=HEADER, buffer=df_segment.buf)[0].tolist()
+        df = pickle.loads(df_segment.buf[HEADER.itemsize:HEADER.itemsize + size])
+        vectors = np.ndarray((n, dim), dtype=np.float32, buffer=vec_segment.buf)
+        vectors.flags.writeable = False
+        return df, vectors, encoder.decode('utf-8')
+
+    def _release_old(self, version):
+        """Ferme les versions antérieures qui ne sont plus référencées."""
+        for old in [v for v in self.segments if v < version]:
+            vec_segment, df_segment = self.segments[old]
+            try:
+                df_segment.close()
+                vec_segment.close()
+            except BufferError:
+                # Des tableaux de cette version sont encore utilisés (requêtes en cours)
+                continue
+            del self.segments[old]
+
+
+_READERS = {}
+_READERS_LOCK = threading.Lock()
+
+
+def _reader(path):
+    prefix = _prefix(path)
+    with _READERS_LOCK:
+        if prefix not in _READERS:
+            _READERS[prefix] = SharedCatalogReader(prefix)
+        return _READERS[prefix]
+
+
+def read_shared(path, model_name=None, dim=None):
+    """
+    Lit le catalogue partagé 'shm://<préfixe>'.
+
+    Returns:
+        (df, vectors) comme catalog_bundle.read_bundle (vecteurs normalisés, triés par espèce) :
+        `vectors` vaut None si le chargeur a utilisé un autre encodeur que `model_name`
+        ou une autre dimension que `dim` (les descriptions doivent alors être ré-encodées).
+    """
+    _, df, vectors, encoder = _reader(path).load()
+    if (model_name and encoder != model_name) or (dim and vectors.shape[1] != dim):
+        print(f"⚠️ AVERTISSEMENT : Embeddings du catalogue partagé '{path}' (encodeur '{encoder}') "
+              f"incompatibles avec l'encodeur '{model_name}', ils seront recalculés.")
+        vectors = None
+    return df, vectors
+
+
+def published_version(path):
+    """Version courante du catalogue partagé 'shm://<préfixe>'."""
+    return _reader(path).version
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Construit le catalogue une fois et le publie en mémoire partagée.")
+    parser.add_argument('--csv', default='data/animals.csv', help="Catalogue CSV ou bundle source")
+    parser.add_argument('--prefix', default='petmatch', help="Préfixe des segments (CATALOG_PATH=shm://<préfixe>)")
+    parser.add_argument('--cache-dir', default='data/cache', help="Dossier du cache d'embeddings")
+    parser.add_argument('--batch-size', type=int, default=64, help="Taille des lots envoyés au modèle")
+    parser.add_argument('--workers', type=int, default=0, help="Nombre de processus d'encodage (0 = processus courant)")
+    parser.add_argument('--encoder', default='transformer', choices=ENCODER_BACKENDS,
+                        help="Moteur d'encodage (voir encoders.py)")
+    parser.add_argument('--encoder-threads', type=int, help="Threads PyTorch de l'encodeur")
+    parser.add_argument('--watch', type=float, default=0,
+                        help="Intervalle (s) de surveillance du catalogue source pour republier (0 = publier une fois)")
+    args = parser.parse_args()
+
+    from matching import AnimalMatcher, configure_encoder
+
+    configure_encoder(args.encoder, args.encoder_threads)
+    matcher = AnimalMatcher(csv_path=args.csv, cache_dir=args.cache_dir,
+                            batch_size=args.batch_size, n_workers=args.workers)
+    matcher.prepare_embeddings()
+    publisher = SharedCatalogPublisher(args.prefix)
+    publisher.publish(matcher.df, matcher.animal_vectors, matcher.vectors_encoder)
+
+    # Le chargeur reste actif : il est propriétaire des segments publiés
+    last_mtime = os.path.getmtime(args.csv)
+    try:
+        while True:
+            time.sleep(args.watch or 3600)
+            if args.watch and os.path.getmtime(args.csv) != last_mtime:
+                last_mtime = os.path.getmtime(args.csv)
+                # Seules les descriptions nouvelles ou modifiées sont ré-encodées
+                matcher.reload_csv()
+                publisher.publish(matcher.df, matcher.animal_vectors, matcher.vectors_encoder)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        publisher.close()
+
+
+if __name__ == '__main__':
+    main()
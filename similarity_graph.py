@@ -0,0 +1,145 @@
+import numpy as np
+
+
+def _row_norms(vectors):
+    norms = np.linalg.norm(np.asarray(vectors, dtype=np.float32), axis=1)
+    norms[norms == 0] = 1.0
+    return norms
+
+
+def _group_slice(vectors, rows):
+    """Vecteurs des lignes `rows` : une vue si elles sont contiguës, une copie sinon."""
+    if len(rows) and rows[-1] - rows[0] + 1 == len(rows):
+        return vectors[rows[0]:rows[-1] + 1]
+    return vectors[rows]
+
+
+def _merge_top_k(rows_a, scores_a, rows_b, scores_b, k):
+    """Fusionne deux listes de voisins (m, ·) en gardant les k meilleurs par ligne (-1 = case vide)."""
+    rows = np.concatenate([rows_a, rows_b], axis=1)
+    scores = np.concatenate([scores_a, scores_b], axis=1)
+    order = np.argsort(-scores, axis=1, kind='stable')[:, :k]
+    return np.take_along_axis(rows, order, axis=1), np.take_along_axis(scores, order, axis=1)
+
+
+class SimilarityGraph:
+    """
+    Graphe des animaux similaires : les k plus proches voisins (cosinus) de chaque animal
+    parmi ceux de la même espèce, calculés une fois pour toutes.
+
+    Le calcul se fait par blocs de lignes (un produit matriciel bloc x espèce, puis un
+    argpartition par ligne), sans jamais matérialiser la matrice n x n. Une fiche détaillée
+    obtient ensuite ses recommandations par une simple lecture, et une mise à jour du
+    catalogue ne recalcule que les lignes touchées (voir patched).
+
+    `neighbors` (n, k) contient les lignes des voisins triées par score décroissant,
+    complétées par -1 (score -inf) quand l'espèce compte moins de k + 1 animaux.
+    """
+
+    def __init__(self, vectors, species, k=6, block_size=1024):
+        self.k = k
+        self.block_size = block_size
+        self.species = np.asarray(species)
+        n = len(self.species)
+        self.neighbors = np.full((n, k), -1, dtype=np.int64)
+        self.scores = np.full((n, k), -np.inf, dtype=np.float32)
+        if n and k:
+            norms = _row_norms(vectors)
+            for name in np.unique(self.species):
+                group = np.flatnonzero(self.species == name)
+                self._fill(vectors, norms, group, group)
+
+    def __len__(self):
+        return len(self.neighbors)
+
+    def _fill(self, vectors, norms, targets, group):
+        """Calcule les voisins des lignes `targets` parmi les lignes `group` (même espèce)."""
+        group_vectors = _group_slice(vectors, group)
+        group_norms = norms[group]
+        kk = min(self.k, len(group) - 1)
+        for start in range(0, len(targets), self.block_size):
+            block = targets[start:start + self.block_size]
+            sims = (vectors[block] @ group_vectors.T) / (norms[block, None] * group_norms[None, :])
+            # Un animal n'est pas son propre voisin
+            sims[group[None, :] == block[:, None]] = -np.inf
+            self.neighbors[block] = -1
+            self.scores[block] = -np.inf
+            if kk <= 0:
+                continue
+            top = np.argpartition(-sims, kk - 1, axis=1)[:, :kk]
+            top_scores = np.take_along_axis(sims, top, axis=1)
+            order = np.argsort(-top_scores, axis=1, kind='stable')
+            self.neighbors[block, :kk] = group[np.take_along_axis(top, order, axis=1)]
+            self.scores[block, :kk] = np.take_along_axis(top_scores, order, axis=1)
+
+    def similar(self, row, k=None):
+        """Retourne (lignes, similarités cosinus) des voisins de la ligne `row`."""
+        k = self.k if k is None else min(k, self.k)
+        rows = self.neighbors[row, :k]
+        valid = rows >= 0
+        return rows[valid], self.scores[row, :k][valid]
+
+    def permuted(self, order):
+        """Copie du graphe dont la ligne i est l'ancienne ligne order[i] (ex. catalogue re-trié par espèce)."""
+        order = np.asarray(order, dtype=np.int64)
+        position = np.empty(len(order), dtype=np.int64)
+        position[order] = np.arange(len(order))
+        graph = SimilarityGraph.__new__(SimilarityGraph)
+        graph.k = self.k
+        graph.block_size = self.block_size
+        graph.species = self.species[order]
+        neighbors = self.neighbors[order]
+        graph.neighbors = np.where(neighbors >= 0, position[np.maximum(neighbors, 0)], -1)
+        graph.scores = self.scores[order]
+        return graph
+
+    def patched(self, keep, vectors, species, added_rows):
+        """
+        Copie du graphe pour le catalogue mis à jour (voir AnimalMatcher._apply_changes).
+
+        `keep` masque les lignes conservées de l'ancien catalogue, `vectors` / `species` décrivent
+        le nouveau catalogue et `added_rows` ses lignes ajoutées. Seules les lignes ajoutées et
+        celles qui ont perdu un voisin sont recalculées; les autres lignes de la même espèce
+        comparent simplement leurs voisins actuels aux animaux ajoutés.
+        """
+        graph = SimilarityGraph.__new__(SimilarityGraph)
+        graph.k = self.k
+        graph.block_size = self.block_size
+        graph.species = np.asarray(species)
+        n = len(graph.species)
+        added_rows = np.asarray(added_rows, dtype=np.int64)
+
+        remap = np.full(len(keep), -1, dtype=np.int64)
+        remap[keep] = np.arange(int(np.sum(keep)))
+        old = self.neighbors[keep]
+        neighbors = np.where(old >= 0, remap[np.maximum(old, 0)], -1)
+        lost = ((old >= 0) & (neighbors < 0)).any(axis=1)
+        graph.neighbors = np.full((n, self.k), -1, dtype=np.int64)
+        graph.scores = np.full((n, self.k), -np.inf, dtype=np.float32)
+        graph.neighbors[:len(neighbors)] = neighbors
+        graph.scores[:len(neighbors)] = self.scores[keep]
+        if not n or not self.k:
+            return graph
+
+        norms = _row_norms(vectors)
+        recompute = np.zeros(n, dtype=bool)
+        recompute[np.flatnonzero(lost)] = True
+        recompute[added_rows] = True
+        for name in np.unique(graph.species[added_rows]) if len(added_rows) else ():
+            group = np.flatnonzero(graph.species == name)
+            new = added_rows[graph.species[added_rows] == name]
+            others = group[~recompute[group]]
+            # Les voisins actuels des autres lignes sont comparés aux seuls animaux ajoutés
+            new_vectors = vectors[new]
+            for start in range(0, len(others), self.block_size):
+                block = others[start:start + self.block_size]
+                sims = (vectors[block] @ new_vectors.T) / (norms[block, None] * norms[new][None, :])
+                graph.neighbors[block], graph.scores[block] = _merge_top_k(
+                    graph.neighbors[block], graph.scores[block],
+                    np.broadcast_to(new, sims.shape), sims.astype(np.float32), self.k)
+
+        targets = np.flatnonzero(recompute)
+        for name in np.unique(graph.species[targets]) if len(targets) else ():
+            group = np.flatnonzero(graph.species == name)
+            graph._fill(vectors, norms, targets[graph.species[targets] == name], group)
+        return graph